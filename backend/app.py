@@ -1,86 +1,393 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 from scraper import RecipeScraper
 from database import Database
+from crawler import SiteCrawler
+from jobs import JobQueue
+from image_store import ImageStore, VARIANTS
+from query_analysis import analyze_query
+from params import MAX_CRAWL_DEPTH, batch_urls, bulk_batch_size, int_param, since_param
+from snapshot import SnapshotError, export_snapshot, import_snapshot
+import metrics
+import threading
+import time
+from datetime import datetime
 import urllib3
 
 # Suppress InsecureRequestWarning from urllib3 since we disabled SSL verification
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-app = Flask(__name__)
-CORS(app) # Enable CORS for all routes
+_MISSING = object()
 
-scraper = RecipeScraper()
-db = Database()
+class Services:
+    """
+    The process's long-lived backend objects. Each one is built on first use,
+    so importing the app or booting a gunicorn worker opens no connection and
+    runs no SQL; the Database connects (and checks the schema) on its first query.
+    """
+    def __init__(self):
+        self._built = {}
+        self._lock = threading.RLock()
 
-@app.route('/api/scan', methods=['POST'])
+    def _get(self, name, build):
+        value = self._built.get(name, _MISSING)
+        if value is _MISSING:
+            with self._lock:
+                value = self._built.get(name, _MISSING)
+                if value is _MISSING:
+                    value = self._built[name] = build()
+        return value
+
+    @property
+    def scraper(self):
+        return self._get("scraper", RecipeScraper)
+
+    @property
+    def db(self):
+        return self._get("db", Database)
+
+    @property
+    def images(self):
+        # None when IMAGE_CACHE_DIR=off
+        return self._get("images", lambda: ImageStore.from_env(self.scraper.fetch_image))
+
+    @property
+    def crawler(self):
+        return self._get("crawler", lambda: SiteCrawler(self.scraper, self.db, images=self.images))
+
+    @property
+    def jobs(self):
+        return self._get("jobs", JobQueue)
+
+services = Services()
+api = Blueprint('api', __name__)
+
+def create_app():
+    """
+    Application factory: builds the Flask app around the shared services.
+    Cheap to call; nothing touches the database or the network until a request needs it.
+    """
+    app = Flask(__name__)
+    CORS(app) # Enable CORS for all routes
+    app.register_blueprint(api)
+    return app
+
+@api.before_app_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@api.after_app_request
+def record_request(response):
+    # Labelled by route pattern, not path, so /api/recipes/<id> stays one series.
+    # Streamed responses are timed until their first byte.
+    start = g.pop('request_start', None)
+    if start is not None:
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, route=route, status=response.status_code)
+        if metrics.SLOW_REQUEST_SECONDS is not None and elapsed >= metrics.SLOW_REQUEST_SECONDS:
+            print(f"SLOW request {request.method} {request.full_path.rstrip('?')} {response.status_code} {elapsed * 1000:.1f}ms")
+    return response
+
+@api.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+def wants_async(data):
+    # Clients opt in with {"async": true} (or ?async=1) and poll /api/jobs/<id>
+    return bool(data.get('async')) or request.args.get('async') in ('1', 'true')
+
+def job_accepted(job):
+    response = job.to_dict()
+    response['status_url'] = f"/api/jobs/{job.id}"
+    return jsonify(response), 202
+
+def import_recipe(url):
+    """
+    Extracts a recipe and saves it to the DB. Shared by the sync and queued endpoints.
+    """
+    result = services.scraper.extract(url)
+    if "error" in result:
+        return result
+
+    # Inject the source URL so it's saved to DB
+    result['url'] = url
+    if services.images:
+        services.images.attach(result)
+
+    # Save to DB
+    recipe_id = services.db.save_recipe_to_db(result)
+    if recipe_id:
+        result['db_id'] = recipe_id
+        print(f"Saved recipe {result.get('name')} to DB with ID {recipe_id}")
+
+    return result
+
+@api.route('/api/scan', methods=['POST'])
 def scan_category():
     data = request.json
     if not data or 'url' not in data:
         return jsonify({"error": "URL is required"}), 400
     
     url = data['url']
+    if wants_async(data):
+        return job_accepted(services.jobs.submit('scan', services.scraper.scan_category, url))
+
     try:
-        result = scraper.scan_category(url)
+        result = services.scraper.scan_category(url)
         if isinstance(result, dict) and "error" in result:
              return jsonify(result), 500
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/scan-root', methods=['POST'])
+@api.route('/api/scan-root', methods=['POST'])
 def scan_root():
     data = request.json
     # Default URL if not provided? Or require one. Let's require one or default to base.
     url = data.get('url', 'https://www.kilometre0.cat/')
     try:
-        result = scraper.scan_root_categories(url)
+        result = services.scraper.scan_root_categories(url)
         if isinstance(result, dict) and "error" in result:
              return jsonify(result), 500
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/extract', methods=['POST'])
+@api.route('/api/crawl', methods=['POST'])
+def start_crawl():
+    data = request.json or {}
+    url = data.get('url', 'https://www.kilometre0.cat/')
+    try:
+        max_depth = int_param(data, 'max_depth', 3, 0, MAX_CRAWL_DEPTH)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        job = services.crawler.start(url, max_depth)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(job.to_dict()), 202
+
+@api.route('/api/crawl', methods=['GET'])
+def list_crawls():
+    return jsonify(services.crawler.frontier.list_jobs())
+
+@api.route('/api/crawl/<job_id>', methods=['GET'])
+def get_crawl(job_id):
+    job = services.crawler.get(job_id)
+    if not job:
+        return jsonify({"error": "Crawl not found"}), 404
+    response = job.to_dict()
+    response['frontier'] = services.crawler.frontier.stats(job_id)
+    return jsonify(response)
+
+@api.route('/api/crawl/<job_id>/resume', methods=['POST'])
+def resume_crawl(job_id):
+    # Picks up the URLs still pending in the frontier; {"retry_failed": true} also retries failed ones
+    data = request.get_json(silent=True) or {}
+    try:
+        job = services.crawler.resume(job_id, retry_failed=bool(data.get('retry_failed')))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if not job:
+        return jsonify({"error": "Crawl not found"}), 404
+    return jsonify(job.to_dict()), 202
+
+@api.route('/api/extract', methods=['POST'])
 def extract_recipe():
     data = request.json
     if not data or 'url' not in data:
         return jsonify({"error": "URL is required"}), 400
     
     url = data['url']
+    if wants_async(data):
+        return job_accepted(services.jobs.submit('extract', import_recipe, url))
+
     try:
-        result = scraper.extract(url)
+        result = import_recipe(url)
         if "error" in result:
              return jsonify(result), 500
-        
-        # Inject the source URL so it's saved to DB
-        result['url'] = url
-        
-        # Save to DB
-        recipe_id = db.save_recipe_to_db(result)
-        if recipe_id:
-            result['db_id'] = recipe_id
-            print(f"Saved recipe {result.get('name')} to DB with ID {recipe_id}")
-
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/recipes/search', methods=['GET'])
+@api.route('/api/extract/batch', methods=['POST'])
+def extract_batch():
+    try:
+        urls = batch_urls(request.json)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return job_accepted(services.jobs.submit_batch('extract', import_recipe, urls))
+
+@api.route('/api/scan/batch', methods=['POST'])
+def scan_batch():
+    try:
+        urls = batch_urls(request.json)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return job_accepted(services.jobs.submit_batch('scan', services.scraper.scan_category, urls))
+
+def cache_missing_images(batch_size=100):
+    """
+    Downloads and resizes the images of recipes imported before the image cache existed.
+    """
+    cached = failed = 0
+    after_id = None
+    while True:
+        rows = services.db.recipes_missing_images(batch_size, after_id)
+        if not rows:
+            break
+        hashes = []
+        for recipe_id, image_url in rows:
+            after_id = recipe_id
+            image_hash = services.images.cache_remote(image_url)
+            if image_hash:
+                hashes.append((recipe_id, image_hash))
+            else:
+                failed += 1
+        services.db.set_image_hashes(hashes)
+        cached += len(hashes)
+    return {"cached": cached, "failed": failed}
+
+@api.route('/api/images/<image_hash>', methods=['GET'])
+def get_image(image_hash):
+    # ?size=thumb|medium (WebP) or omitted for the original. Content-addressed, so cache forever.
+    size = request.args.get('size')
+    if size and size not in VARIANTS and size != 'original':
+        return jsonify({"error": f"Unknown size: {size}"}), 400
+    found = services.images.get(image_hash, size) if services.images else None
+    if not found:
+        return jsonify({"error": "Image not found"}), 404
+
+    path, mimetype = found
+    response = send_file(path, mimetype=mimetype, max_age=31536000, etag=f"{image_hash}-{size or 'original'}")
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@api.route('/api/images/backfill', methods=['POST'])
+def backfill_images():
+    if not services.images:
+        return jsonify({"error": "Image cache is disabled"}), 400
+    return job_accepted(services.jobs.submit('images', cache_missing_images))
+
+@api.route('/api/scraper/metrics', methods=['GET'])
+def scraper_metrics():
+    # Per-host queue depth, wait times, retries and current rate of the fetch scheduler
+    return jsonify(services.scraper.scheduler.metrics())
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = services.jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@api.route('/api/recipes/search', methods=['GET'])
 def search_recipes():
     query = request.args.get('q', '')
     if not query:
         return jsonify([])
     
-    results = db.search_recipes_in_db(query)
+    # The interpreter decides between a dish-name search and a pantry-style
+    # ingredient search; ?mode=title|ingredients overrides it.
+    parsed = analyze_query(query)
+    mode = request.args.get('mode') or parsed.intent
+
+    if mode == 'ingredients':
+        results = services.db.search_recipes_by_ingredients(parsed)
+        if not results and 'mode' not in request.args:
+            results = services.db.search_recipes_in_db(parsed)
+    else:
+        results = services.db.search_recipes_in_db(parsed)
     return jsonify(results)
 
-@app.route('/api/recipes', methods=['GET'])
+@api.route('/api/recipes/suggest', methods=['GET'])
+def suggest_recipes():
+    # Typeahead: served from memory, no database round trip
+    prefix = request.args.get('prefix', '')
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify(services.db.suggest(prefix, limit))
+
+def stream_recipes(rows, fmt):
+    """
+    Streams the whole library as NDJSON (one recipe per line) or as a JSON array,
+    without building the full list in memory.
+    """
+    def ndjson():
+        for row in rows:
+            yield current_app.json.dumps(row) + "\n"
+
+    def json_array():
+        yield "["
+        for index, row in enumerate(rows):
+            yield ("," if index else "") + current_app.json.dumps(row)
+        yield "]"
+
+    if fmt == 'ndjson':
+        return Response(stream_with_context(ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(json_array()), mimetype='application/json')
+
+@api.route('/api/recipes', methods=['GET'])
 def get_recipes():
-    results = db.get_all_recipes()
-    return jsonify(results)
+    # ?fields=id,name limits the columns returned
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or None
+    stream = request.args.get('stream')
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    changed_since = request.args.get('changed_since')
+
+    try:
+        # ?changed_since=<ISO timestamp> lists only recipes whose content changed since then
+        if changed_since:
+            since = since_param(changed_since)
+            limit = max(1, min(int(limit or 500), 500))
+            items, next_cursor = services.db.list_changed_since(since, limit=limit, cursor=cursor, fields=fields)
+            return jsonify({"items": items, "next_cursor": next_cursor})
 
-@app.route('/api/recipes', methods=['POST'])
+        if stream in ('ndjson', 'json'):
+            return stream_recipes(services.db.iter_recipes(fields), stream)
+
+        # ?limit=N[&cursor=...] switches to keyset pagination
+        if limit or cursor:
+            limit = max(1, min(int(limit or 50), 500))
+            items, next_cursor = services.db.list_recipes(limit=limit, cursor=cursor, fields=fields)
+            return jsonify({"items": items, "next_cursor": next_cursor})
+
+        results = services.db.get_all_recipes(fields)
+        return jsonify(results)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/recipes/snapshot', methods=['GET'])
+def export_recipes_snapshot():
+    # Binary snapshot of the whole library (see snapshot.py), streamed block by block
+    filename = f"recipes-{datetime.now():%Y%m%d-%H%M%S}.snap"
+    return Response(
+        stream_with_context(export_snapshot(services.db)),
+        mimetype='application/octet-stream',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@api.route('/api/recipes/snapshot', methods=['POST'])
+def import_recipes_snapshot():
+    # The request body is the snapshot file; it is restored while it is read
+    try:
+        result = import_snapshot(services.db, request.stream)
+    except SnapshotError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(result)
+
+@api.route('/api/recipes', methods=['POST'])
 def add_recipe():
     data = request.json
     if not data or 'name' not in data:
@@ -88,22 +395,57 @@ def add_recipe():
     
     # Ensure source_url is unique or None if manual
     if 'url' not in data or not data['url']:
-        import time
         data['url'] = f"manual-{time.time()}"
 
-    recipe_id = db.save_recipe_to_db(data)
+    recipe_id = services.db.save_recipe_to_db(data)
     if recipe_id:
         return jsonify({"id": recipe_id, "message": "Recipe saved"}), 201
     else:
         return jsonify({"error": "Failed to save recipe"}), 500
 
-@app.route('/api/recipes/<recipe_id>', methods=['DELETE'])
+@api.route('/api/recipes/bulk', methods=['POST'])
+def add_recipes_bulk():
+    data = request.json
+    recipes = data.get('recipes') if isinstance(data, dict) else data
+    if not isinstance(recipes, list) or not recipes:
+        return jsonify({"error": "A list of recipes is required"}), 400
+    if any(not isinstance(r, dict) or not r.get('name') for r in recipes):
+        return jsonify({"error": "Name is required"}), 400
+
+    for index, recipe in enumerate(recipes):
+        if not recipe.get('url'):
+            recipe['url'] = f"manual-{time.time()}-{index}"
+
+    try:
+        batch_size = bulk_batch_size(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    saved = services.db.save_recipes_bulk(recipes, batch_size=batch_size)
+    if not saved:
+        return jsonify({"error": "Failed to save recipes"}), 500
+    return jsonify({"saved": len(saved), "ids": saved, "message": "Recipes saved"}), 201
+
+@api.route('/api/recipes/duplicates', methods=['GET'])
+def list_duplicates():
+    # Near-duplicates flagged at import; they are hidden from search until unflagged or deleted
+    return jsonify(services.db.list_duplicates())
+
+@api.route('/api/recipes/<recipe_id>/duplicate_of', methods=['DELETE'])
+def clear_duplicate(recipe_id):
+    if services.db.clear_duplicate(recipe_id):
+        return jsonify({"message": "Duplicate flag cleared"}), 200
+    return jsonify({"error": "Recipe not flagged as duplicate"}), 404
+
+@api.route('/api/recipes/<recipe_id>', methods=['DELETE'])
 def delete_recipe(recipe_id):
-    success = db.delete_recipe(recipe_id)
+    success = services.db.delete_recipe(recipe_id)
     if success:
         return jsonify({"message": "Recipe deleted"}), 200
     else:
         return jsonify({"error": "Failed to delete recipe"}), 500
 
+# gunicorn app:app, or app:create_app()
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
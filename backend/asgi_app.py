@@ -0,0 +1,311 @@
+"""
+Async (ASGI) variant of the API in app.py, for FastAPI + uvicorn:
+
+    uvicorn asgi_app:app --port 5000
+
+Serves the same scan/extract/recipe routes with aiohttp for outbound requests and
+an asyncpg pool for reads, so one process can keep hundreds of extracts and
+searches in flight. Background crawls and /api/jobs stay in the Flask app.
+"""
+import asyncio
+import json
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from database import Database
+from async_database import AsyncDatabase
+from async_scraper import AsyncRecipeScraper
+from query_analysis import analyze_query
+from snapshot import SnapshotError, export_snapshot, import_snapshot
+from params import batch_urls, bulk_batch_size, since_param
+from image_store import ImageStore, VARIANTS
+import metrics
+
+db = None
+scraper = None
+images = None
+
+@asynccontextmanager
+async def lifespan(app):
+    global db, scraper, images
+    # The sync Database checks (and if needed migrates) the schema and detects the
+    # search extensions the shared SQL builders depend on
+    sync_db = Database()
+    await asyncio.to_thread(sync_db.open)
+    db = AsyncDatabase(sync_db)
+    await db.connect()
+    scraper = AsyncRecipeScraper()
+    await scraper.start()
+    images = ImageStore.from_env(scraper.scraper.fetch_image)
+    try:
+        yield
+    finally:
+        await scraper.close()
+        await db.close()
+        sync_db.close()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+@app.middleware('http')
+async def record_request(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    route = request.scope.get('route')
+    metrics.HTTP_REQUEST_SECONDS.observe(
+        elapsed, method=request.method, route=route.path if route else "unmatched", status=response.status_code
+    )
+    if metrics.SLOW_REQUEST_SECONDS is not None and elapsed >= metrics.SLOW_REQUEST_SECONDS:
+        print(f"SLOW request {request.method} {request.url.path} {response.status_code} {elapsed * 1000:.1f}ms")
+    return response
+
+@app.get('/metrics')
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+def respond(data, status_code=200):
+    return JSONResponse(jsonable_encoder(data), status_code=status_code)
+
+async def json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+async def import_recipe(url):
+    """
+    Extracts a recipe and saves it to the DB, like app.import_recipe.
+    """
+    result = await scraper.extract(url)
+    if "error" in result:
+        return result
+
+    result['url'] = url
+    if images:
+        await asyncio.to_thread(images.attach, result)
+    recipe_id = await db.save_recipe_to_db(result)
+    if recipe_id:
+        result['db_id'] = recipe_id
+        print(f"Saved recipe {result.get('name')} to DB with ID {recipe_id}")
+    return result
+
+@app.post('/api/scan')
+async def scan_category(request: Request):
+    data = await json_body(request)
+    if not data or 'url' not in data:
+        return respond({"error": "URL is required"}, 400)
+
+    result = await scraper.scan_category(data['url'])
+    if isinstance(result, dict) and "error" in result:
+        return respond(result, 500)
+    return respond(result)
+
+@app.post('/api/scan-root')
+async def scan_root(request: Request):
+    data = await json_body(request) or {}
+    result = await scraper.scan_root_categories(data.get('url', 'https://www.kilometre0.cat/'))
+    if isinstance(result, dict) and "error" in result:
+        return respond(result, 500)
+    return respond(result)
+
+@app.post('/api/scan/batch')
+async def scan_batch(request: Request):
+    data = await json_body(request)
+    try:
+        urls = batch_urls(data)
+    except ValueError as e:
+        return respond({"error": str(e)}, 400)
+
+    results = await asyncio.gather(*(scraper.scan_category(url) for url in urls))
+    return respond([{"input": url, "result": result} for url, result in zip(urls, results)])
+
+@app.post('/api/extract')
+async def extract_recipe(request: Request):
+    data = await json_body(request)
+    if not data or 'url' not in data:
+        return respond({"error": "URL is required"}, 400)
+
+    result = await import_recipe(data['url'])
+    if "error" in result:
+        return respond(result, 500)
+    return respond(result)
+
+@app.post('/api/extract/batch')
+async def extract_batch(request: Request):
+    # Runs every extract concurrently and answers when all are done
+    data = await json_body(request)
+    try:
+        urls = batch_urls(data)
+    except ValueError as e:
+        return respond({"error": str(e)}, 400)
+
+    results = await asyncio.gather(*(import_recipe(url) for url in urls))
+    return respond([{"input": url, "result": result} for url, result in zip(urls, results)])
+
+@app.get('/api/recipes/search')
+async def search_recipes(request: Request):
+    query = request.query_params.get('q', '')
+    if not query:
+        return respond([])
+
+    parsed = analyze_query(query)
+    mode = request.query_params.get('mode') or parsed.intent
+
+    if mode == 'ingredients':
+        results = await db.search_recipes_by_ingredients(parsed)
+        if not results and 'mode' not in request.query_params:
+            results = await db.search_recipes_in_db(parsed)
+    else:
+        results = await db.search_recipes_in_db(parsed)
+    return respond(results)
+
+@app.get('/api/recipes/suggest')
+async def suggest_recipes(request: Request):
+    prefix = request.query_params.get('prefix', '')
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+    except ValueError:
+        return respond({"error": "limit must be an integer"}, 400)
+    return respond(await db.suggest(prefix, limit))
+
+@app.get('/api/images/{image_hash}')
+async def get_image(image_hash: str, size: str = None):
+    if size and size not in VARIANTS and size != 'original':
+        return respond({"error": f"Unknown size: {size}"}, 400)
+    found = await asyncio.to_thread(images.get, image_hash, size) if images else None
+    if not found:
+        return respond({"error": "Image not found"}, 404)
+
+    path, mimetype = found
+    return FileResponse(path, media_type=mimetype, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+def stream_recipes(rows, fmt):
+    async def ndjson():
+        async for row in rows:
+            yield json.dumps(jsonable_encoder(row)) + "\n"
+
+    async def json_array():
+        yield "["
+        first = True
+        async for row in rows:
+            yield ("" if first else ",") + json.dumps(jsonable_encoder(row))
+            first = False
+        yield "]"
+
+    if fmt == 'ndjson':
+        return StreamingResponse(ndjson(), media_type='application/x-ndjson')
+    return StreamingResponse(json_array(), media_type='application/json')
+
+@app.get('/api/recipes')
+async def get_recipes(request: Request):
+    args = request.query_params
+    fields = [f.strip() for f in args.get('fields', '').split(',') if f.strip()] or None
+    stream = args.get('stream')
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    changed_since = args.get('changed_since')
+
+    try:
+        if changed_since:
+            since = since_param(changed_since)
+            limit = max(1, min(int(limit or 500), 500))
+            items, next_cursor = await db.list_changed_since(since, limit=limit, cursor=cursor, fields=fields)
+            return respond({"items": items, "next_cursor": next_cursor})
+
+        if stream in ('ndjson', 'json'):
+            return stream_recipes(db.iter_recipes(fields), stream)
+
+        if limit or cursor:
+            limit = max(1, min(int(limit or 50), 500))
+            items, next_cursor = await db.list_recipes(limit=limit, cursor=cursor, fields=fields)
+            return respond({"items": items, "next_cursor": next_cursor})
+
+        return respond(await db.get_all_recipes(fields))
+    except ValueError as e:
+        return respond({"error": str(e)}, 400)
+    except Exception as e:
+        return respond({"error": str(e)}, 500)
+
+@app.get('/api/recipes/snapshot')
+async def export_recipes_snapshot():
+    # export_snapshot reads through the sync Database; Starlette iterates it in a worker thread
+    filename = f"recipes-{datetime.now():%Y%m%d-%H%M%S}.snap"
+    return StreamingResponse(
+        export_snapshot(db.db),
+        media_type='application/octet-stream',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.post('/api/recipes/snapshot')
+async def import_recipes_snapshot(request: Request):
+    # The snapshot reader is blocking, so the body is spooled (to disk past 8 MB) and
+    # restored in a worker thread
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        try:
+            result = await asyncio.to_thread(import_snapshot, db.db, body)
+        except SnapshotError as e:
+            return respond({"error": str(e)}, 400)
+        except Exception as e:
+            return respond({"error": str(e)}, 500)
+    return respond(result)
+
+@app.post('/api/recipes')
+async def add_recipe(request: Request):
+    data = await json_body(request)
+    if not data or 'name' not in data:
+        return respond({"error": "Name is required"}, 400)
+
+    if 'url' not in data or not data['url']:
+        data['url'] = f"manual-{time.time()}"
+
+    recipe_id = await db.save_recipe_to_db(data)
+    if recipe_id:
+        return respond({"id": recipe_id, "message": "Recipe saved"}, 201)
+    return respond({"error": "Failed to save recipe"}, 500)
+
+@app.post('/api/recipes/bulk')
+async def add_recipes_bulk(request: Request):
+    data = await json_body(request)
+    recipes = data.get('recipes') if isinstance(data, dict) else data
+    if not isinstance(recipes, list) or not recipes:
+        return respond({"error": "A list of recipes is required"}, 400)
+    if any(not isinstance(r, dict) or not r.get('name') for r in recipes):
+        return respond({"error": "Name is required"}, 400)
+
+    for index, recipe in enumerate(recipes):
+        if not recipe.get('url'):
+            recipe['url'] = f"manual-{time.time()}-{index}"
+
+    try:
+        batch_size = bulk_batch_size(data)
+    except ValueError as e:
+        return respond({"error": str(e)}, 400)
+    saved = await db.save_recipes_bulk(recipes, batch_size=batch_size)
+    if not saved:
+        return respond({"error": "Failed to save recipes"}, 500)
+    return respond({"saved": len(saved), "ids": saved, "message": "Recipes saved"}, 201)
+
+@app.get('/api/recipes/duplicates')
+async def list_duplicates():
+    return respond(await db.list_duplicates())
+
+@app.delete('/api/recipes/{recipe_id}/duplicate_of')
+async def clear_duplicate(recipe_id: str):
+    if await db.clear_duplicate(recipe_id):
+        return respond({"message": "Duplicate flag cleared"})
+    return respond({"error": "Recipe not flagged as duplicate"}, 404)
+
+@app.delete('/api/recipes/{recipe_id}')
+async def delete_recipe(recipe_id: str):
+    if await db.delete_recipe(recipe_id):
+        return respond({"message": "Recipe deleted"})
+    return respond({"error": "Failed to delete recipe"}, 500)
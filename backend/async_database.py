@@ -0,0 +1,164 @@
+import asyncio
+import json
+import os
+import re
+import asyncpg
+from query_analysis import ParsedQuery, analyze_query
+from metrics import DB_QUERY_SECONDS, DB_QUERY_ERRORS, SEARCH_CACHE_TOTAL, SLOW_QUERY_SECONDS, timed
+
+_PLACEHOLDER_RE = re.compile(r"%%|%s")
+
+def to_asyncpg(sql):
+    """
+    Rewrites psycopg2 placeholders (%s, %% for a literal %) to asyncpg's $1, $2...
+    so both drivers run the same SQL.
+    """
+    counter = iter(range(1, 10000))
+    return _PLACEHOLDER_RE.sub(lambda m: '%' if m.group() == '%%' else f"${next(counter)}", sql)
+
+class AsyncDatabase:
+    """
+    asyncpg-backed read path for the ASGI API. SQL is built by the sync Database
+    (same queries, same search cache and suggest index); reads run on an asyncpg
+    pool so a waiting query never ties up a thread.
+
+    Writes are rare and also maintain the ingredient index, search cache and
+    suggest index, so they are delegated to the sync Database in a worker thread.
+    """
+    def __init__(self, db):
+        self.db = db
+        self.pool = None
+        self.pool_max = int(os.getenv("ASYNC_DB_POOL_MAX", "20"))
+
+    async def connect(self):
+        try:
+            self.pool = await asyncpg.create_pool(
+                host=self.db.host,
+                database=self.db.database,
+                user=self.db.user,
+                password=self.db.password,
+                port=int(self.db.port),
+                min_size=self.db.pool_min,
+                max_size=self.pool_max,
+                init=self._init_connection
+            )
+            print(f"Connected to PostgreSQL database (async pool {self.db.pool_min}-{self.pool_max})")
+        except Exception as e:
+            print(f"Error connecting to database (async): {e}")
+            self.pool = None
+
+    async def _init_connection(self, conn):
+        # Decode JSONB like psycopg2 does, instead of returning raw strings
+        await conn.set_type_codec('jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def _fetch(self, sql, params=(), query="other"):
+        if self.pool is None:
+            raise RuntimeError("Database not connected")
+        describe = lambda: " ".join(sql.split())[:200]
+        try:
+            with timed(DB_QUERY_SECONDS, SLOW_QUERY_SECONDS, describe, query=query):
+                rows = await self.pool.fetch(to_asyncpg(sql), *params)
+        except Exception:
+            DB_QUERY_ERRORS.inc(query=query)
+            raise
+        return [dict(row) for row in rows]
+
+    async def _cached_query(self, cache_key, sql, params, query="search"):
+        cache = self.db.search_cache
+        if cache is not None:
+            results, generation = cache.get(cache_key)
+            SEARCH_CACHE_TOTAL.inc(result="miss" if results is None else "hit")
+            if results is not None:
+                return results
+
+        results = await self._fetch(sql, params, query)
+        if cache is not None:
+            cache.set(cache_key, results, generation)
+        return results
+
+    async def search_recipes_in_db(self, query):
+        parsed = query if isinstance(query, ParsedQuery) else analyze_query(query)
+        if self.db._use_memory_index():
+            return self.db.search_recipes_in_db(parsed)
+
+        search = self.db._text_search_query(parsed)
+        if search is None:
+            return []
+        try:
+            return await self._cached_query(*search, query="search_text")
+        except Exception as e:
+            print(f"Error searching recipes: {e}")
+            return []
+
+    async def search_recipes_by_ingredients(self, query):
+        parsed = query if isinstance(query, ParsedQuery) else analyze_query(query)
+        if self.db._use_memory_index():
+            return self.db.search_recipes_by_ingredients(parsed)
+
+        search = self.db._ingredient_search_query(parsed)
+        if search is None:
+            return []
+        try:
+            return await self._cached_query(*search, query="search_ingredients")
+        except Exception as e:
+            print(f"Error searching recipes by ingredients: {e}")
+            return []
+
+    async def get_all_recipes(self, fields=None):
+        # Answered from the in-process replica when MEMORY_INDEX=on
+        if self.db._use_memory_index():
+            return self.db.get_all_recipes(fields)
+        sql = f"SELECT {self.db._projection(fields)} FROM recipes ORDER BY created_at DESC"
+        try:
+            return await self._fetch(sql, query="get_all_recipes")
+        except Exception as e:
+            print(f"Error getting recipes: {e}")
+            return []
+
+    async def list_recipes(self, limit=50, cursor=None, fields=None):
+        sql, params = self.db._list_query(limit, cursor, fields)
+        return self.db._paginate(await self._fetch(sql, params, "list_recipes"), limit)
+
+    async def list_changed_since(self, since, limit=500, cursor=None, fields=None):
+        sql, params = self.db._changed_since_query(since, limit, cursor, fields)
+        return self.db._paginate(await self._fetch(sql, params, "list_changed_since"), limit)
+
+    def iter_recipes(self, fields=None, batch_size=1000):
+        """
+        Async generator over every recipe using a server-side cursor.
+        Fields are validated before the generator is returned.
+        """
+        columns = self.db._projection(fields)
+        sql = f"SELECT {columns} FROM recipes ORDER BY created_at DESC, id DESC"
+
+        async def rows():
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    async for row in conn.cursor(sql, prefetch=batch_size):
+                        yield dict(row)
+
+        return rows()
+
+    async def suggest(self, prefix, limit=10):
+        # The first call builds the suggest index from the whole table
+        return await asyncio.to_thread(self.db.suggest, prefix, limit)
+
+    async def save_recipe_to_db(self, recipe_data):
+        return await asyncio.to_thread(self.db.save_recipe_to_db, recipe_data)
+
+    async def save_recipes_bulk(self, recipes, batch_size=None):
+        return await asyncio.to_thread(self.db.save_recipes_bulk, recipes, batch_size)
+
+    async def list_duplicates(self):
+        return await asyncio.to_thread(self.db.list_duplicates)
+
+    async def clear_duplicate(self, recipe_id):
+        return await asyncio.to_thread(self.db.clear_duplicate, recipe_id)
+
+    async def delete_recipe(self, recipe_id):
+        return await asyncio.to_thread(self.db.delete_recipe, recipe_id)
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import random
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+import aiohttp
+from scraper import RecipeScraper
+from fetch_scheduler import RETRY_STATUSES, THROTTLE_STATUSES
+from fingerprint import recipe_fingerprint
+from metrics import SCRAPER_PHASE_SECONDS, SCRAPER_PAGES_TOTAL, SLOW_FETCH_SECONDS, timed
+
+class AsyncHostGate:
+    """
+    asyncio counterpart of fetch_scheduler.HostState: caps concurrent requests to
+    one host and spaces them `1 / rate` seconds apart (or the robots.txt
+    Crawl-delay), without holding a thread while waiting.
+    """
+    def __init__(self, rate, max_concurrency):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+        self.ready = asyncio.Event()
+
+    def set_crawl_delay(self, delay):
+        if delay:
+            self.interval = max(self.interval, delay)
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self.next_slot, self.paused_until)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+    def throttle(self, delay):
+        self.paused_until = max(self.paused_until, asyncio.get_running_loop().time() + delay)
+
+class AsyncRecipeScraper:
+    """
+    Non-blocking fetch layer for the ASGI API. Downloads go through aiohttp with the
+    same headers, page cache, politeness settings and retry policy as RecipeScraper;
+    parsing goes through RecipeScraper.parse_page in a worker thread so the event
+    loop keeps serving other requests.
+    """
+    def __init__(self, scraper=None):
+        self.scraper = scraper or RecipeScraper()
+        self.scheduler = self.scraper.scheduler
+        self.cache = self.scraper.cache
+        self.session = None
+        self.hosts = {}
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(limit=int(os.getenv("ASYNC_HTTP_CONNECTIONS", "100")), ssl=False)
+        self.session = aiohttp.ClientSession(
+            headers=self.scraper.headers,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.scheduler.timeout)
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        await asyncio.to_thread(self.scraper.shutdown)
+
+    async def _gate(self, url):
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        gate = self.hosts.get(host)
+        if gate is None:
+            gate = AsyncHostGate(self.scheduler.rate, self.scheduler.max_concurrency)
+            self.hosts[host] = gate
+            try:
+                if self.scheduler.respect_robots:
+                    robots_url = f"{parts.scheme}://{parts.netloc}/robots.txt"
+                    gate.set_crawl_delay(await asyncio.to_thread(self.scheduler._robots_crawl_delay, robots_url))
+            finally:
+                gate.ready.set()
+        else:
+            await gate.ready.wait()
+        return gate
+
+    async def _get(self, url, headers=None):
+        """
+        GET with the scheduler's retry policy. Returns (status, headers, body).
+        """
+        gate = await self._gate(url)
+        for attempt in range(self.scheduler.max_retries + 1):
+            try:
+                async with gate:
+                    async with self.session.get(url, headers=headers or {}, allow_redirects=True) as response:
+                        body = await response.read()
+                        status, response_headers = response.status, response.headers
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.scheduler.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.scheduler.backoff_max, self.scheduler.backoff_base * (2 ** attempt)))
+                print(f"{url}: {e.__class__.__name__}, retrying in {delay:.1f}s")
+            else:
+                if status not in RETRY_STATUSES or attempt == self.scheduler.max_retries:
+                    return status, response_headers, body
+                delay = self.scheduler._backoff(attempt, SimpleNamespace(headers=response_headers))
+                if status in THROTTLE_STATUSES:
+                    gate.throttle(delay)
+                print(f"{url}: HTTP {status}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _fetch(self, url):
+        """
+        Async version of RecipeScraper._fetch. Returns (content, not_modified).
+        """
+        headers = self.cache.conditional_headers(url) if self.cache else {}
+        status, response_headers, body = await self._get(url, headers)
+
+        if status == 304 and self.cache:
+            content = self.cache.get_body(url)
+            if content is not None:
+                return content, True
+            status, response_headers, body = await self._get(url)
+
+        if status >= 400:
+            raise RuntimeError(f"{status} Error for url: {url}")
+        if self.cache:
+            self.cache.put(url, SimpleNamespace(headers=response_headers, content=body))
+        return body, False
+
+    async def _fetch_and_parse(self, url, kind):
+        with timed(SCRAPER_PHASE_SECONDS, SLOW_FETCH_SECONDS, lambda: url, kind=kind, phase="fetch"):
+            content, not_modified = await self._fetch(url)
+        if not_modified:
+            result = self.cache.get_result(url, kind)
+            if result is not None:
+                SCRAPER_PAGES_TOTAL.inc(kind=kind, cache="reused")
+                return result
+
+        SCRAPER_PAGES_TOTAL.inc(kind=kind, cache="parsed")
+        with timed(SCRAPER_PHASE_SECONDS, kind=kind, phase="parse"):
+            result = await asyncio.to_thread(self.scraper.parse_page, kind, url, content)
+        if self.cache and not (isinstance(result, dict) and "error" in result):
+            self.cache.put_result(url, kind, result)
+        return result
+
+    async def scan_root_categories(self, url):
+        try:
+            return await self._fetch_and_parse(url, 'root')
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def scan_category(self, url):
+        try:
+            return await self._fetch_and_parse(url, 'category')
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def extract(self, url):
+        try:
+            result = await self._fetch_and_parse(url, 'extract')
+        except Exception as e:
+            return {"error": str(e)}
+
+        if isinstance(result, dict) and "error" not in result:
+            result['contentHash'] = recipe_fingerprint(result)
+        return result
@@ -0,0 +1,118 @@
+"""
+Compares per-page parse time and peak memory of the original html5lib
+full-tree parse against the current parser path of RecipeScraper.
+
+Usage: python benchmarks/parse_bench.py [page.html | directory ...]
+(defaults to the recorded pages in benchmarks/fixtures)
+
+Then times RecipeScraper.extract_batch over the kilometre0.cat pages, in the
+calling thread and in the parse process pool (PARSE_WORKERS, or one worker
+per core when it is unset; at least two), and reports pages per second.
+
+Pages are recipe pages saved to disk; files whose name contains
+"kilometre0" are parsed as kilometre0.cat pages, the rest as JSON-LD pages.
+"""
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("SCRAPER_CACHE_DIR", "off")
+
+from bs4 import BeautifulSoup
+from scraper import RecipeScraper
+
+def collect_pages(paths):
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(('.html', '.htm')):
+                    pages.append(os.path.join(path, name))
+        else:
+            pages.append(path)
+    return pages
+
+def page_url(path):
+    name = os.path.basename(path)
+    if 'kilometre0' in name:
+        return f"https://www.kilometre0.cat/{name}"
+    return f"https://example.com/{name}"
+
+def before(scraper, url, content):
+    # Baseline: html5lib full tree for every strategy
+    soup = BeautifulSoup(content, 'html5lib')
+    if 'kilometre0.cat' in url:
+        data = scraper._extract_kilometre0(soup)
+        if data:
+            return data
+    return scraper._extract_json_ld(soup)
+
+def after(scraper, url, content):
+    return scraper._parse_recipe(url, content)
+
+def measure(fn, scraper, pages, repeat):
+    timings = []
+    peaks = []
+    for path, url, content in pages:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(scraper, url, content)
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        fn(scraper, url, content)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return timings, peaks
+
+def batch_throughput(scraper, pages, repeat):
+    # Same pages several times over, like the recipes of a large category
+    batch = [(url, content) for _, url, content in pages if 'kilometre0' in url] * repeat * 20
+    if not batch:
+        return
+    print(f"\nextract_batch over {len(batch)} kilometre0.cat pages")
+    configured = scraper.parse_workers
+    # The pool needs at least two workers; below that extract_batch parses in-thread
+    workers = max(configured if configured > 1 else os.cpu_count() or 1, 2)
+    for label, parse_workers in (("in-thread", 0), (f"{workers} workers", workers)):
+        scraper.parse_workers = parse_workers
+        if parse_workers > 1:
+            # Start the workers before timing
+            list(scraper.extract_batch(batch[:parse_workers]))
+        start = time.perf_counter()
+        errors = sum(1 for _, result in scraper.extract_batch(batch) if "error" in result)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<12}{len(batch) / elapsed:>10.0f} pages/s{'':>4}{errors} errors")
+    scraper.parse_workers = configured
+    scraper.shutdown()
+
+def main(argv):
+    paths = collect_pages(argv or [os.path.join(os.path.dirname(__file__), 'fixtures')])
+    if not paths:
+        print(__doc__)
+        return 1
+
+    scraper = RecipeScraper()
+    pages = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            pages.append((path, page_url(path), f.read()))
+
+    repeat = int(os.getenv("BENCH_REPEAT", "5"))
+    print(f"{len(pages)} pages, {repeat} runs each (parser: {scraper.parser})")
+    print(f"{'variant':<12}{'p50 ms':>10}{'mean ms':>10}{'max ms':>10}{'peak KiB':>12}")
+    for label, fn in (("html5lib", before), ("current", after)):
+        timings, peaks = measure(fn, scraper, pages, repeat)
+        print(f"{label:<12}"
+              f"{statistics.median(timings) * 1000:>10.2f}"
+              f"{statistics.mean(timings) * 1000:>10.2f}"
+              f"{max(timings) * 1000:>10.2f}"
+              f"{statistics.mean(peaks) / 1024:>12.0f}")
+    batch_throughput(scraper, pages, repeat)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
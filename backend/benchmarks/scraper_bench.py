@@ -0,0 +1,193 @@
+"""
+Offline benchmark for RecipeScraper. Replays the recorded pages listed in
+fixtures/corpus.json through each extraction strategy and reports throughput,
+parse latency, peak RSS and how complete the extracted recipes are.
+
+Usage:
+    python benchmarks/scraper_bench.py                    # all strategies
+    python benchmarks/scraper_bench.py --strategy extract --repeat 50
+    SCRAPER_PARSER=html5lib python benchmarks/scraper_bench.py
+    python benchmarks/scraper_bench.py --record <url> --kind recipe
+
+Each strategy runs in its own process so peak RSS is not polluted by the others.
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("SCRAPER_CACHE_DIR", "off")
+
+from scraper import RecipeScraper, JSON_LD_ONLY
+from extractors import Kilometre0Extractor, default_registry
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), 'fixtures')
+RECIPE_FIELDS = ('name', 'ingredients', 'instructions', 'imageUrl')
+
+EXTRACTORS = default_registry()
+
+def is_kilometre0(entry):
+    return isinstance(EXTRACTORS.for_url(entry['url']), Kilometre0Extractor)
+
+# name -> (pages it applies to, function(scraper, entry, content))
+STRATEGIES = {
+    "root": (
+        lambda e: e['kind'] == 'root',
+        lambda s, e, c: s._parse_root_categories(e['url'], c)
+    ),
+    "category": (
+        lambda e: e['kind'] == 'category',
+        lambda s, e, c: s._parse_category(e['url'], c)
+    ),
+    "kilometre0": (
+        lambda e: e['kind'] == 'recipe' and is_kilometre0(e),
+        lambda s, e, c: s._extract_kilometre0(s._make_soup(c))
+    ),
+    "json_ld": (
+        lambda e: e['kind'] == 'recipe' and not is_kilometre0(e),
+        lambda s, e, c: s._extract_json_ld(s._make_soup(c, parse_only=JSON_LD_ONLY))
+    ),
+    "extract": (
+        lambda e: e['kind'] == 'recipe',
+        lambda s, e, c: s._parse_recipe(e['url'], c)
+    ),
+}
+RECIPE_STRATEGIES = {"kilometre0", "json_ld", "extract"}
+
+def load_corpus(directory):
+    with open(os.path.join(directory, 'corpus.json'), encoding='utf-8') as f:
+        entries = json.load(f)
+    pages = []
+    for entry in entries:
+        with open(os.path.join(directory, entry['file']), 'rb') as f:
+            pages.append((entry, f.read()))
+    return pages
+
+def max_rss_kib():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+def field_filled(recipe, field):
+    value = recipe.get(field)
+    if field == 'name':
+        return bool(value) and value not in ('Sense títol', 'Recepta sense títol')
+    return bool(value)
+
+def run_strategy(name, corpus_dir, repeat):
+    applies, fn = STRATEGIES[name]
+    scraper = RecipeScraper()
+    pages = [(e, c) for e, c in load_corpus(corpus_dir) if applies(e)]
+    baseline_rss = max_rss_kib()
+
+    timings = []
+    outputs = []
+    total_start = time.perf_counter()
+    for entry, content in pages:
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn(scraper, entry, content)
+            timings.append(time.perf_counter() - start)
+        outputs.append(result)
+    total = time.perf_counter() - total_start
+
+    stats = {
+        "strategy": name,
+        "parser": scraper.parser,
+        "pages": len(pages),
+        "runs": len(timings),
+        "pages_per_sec": len(timings) / total if total else 0,
+        "p50_ms": statistics.median(timings) * 1000 if timings else 0,
+        "p99_ms": statistics.quantiles(timings, n=100)[98] * 1000 if len(timings) > 1 else sum(timings) * 1000,
+        "peak_rss_kib": max_rss_kib(),
+        "rss_growth_kib": max_rss_kib() - baseline_rss,
+    }
+
+    if name in RECIPE_STRATEGIES:
+        recipes = [r for r in outputs if isinstance(r, dict) and "error" not in r]
+        stats["recipes"] = f"{len(recipes)}/{len(pages)}"
+        stats["fields"] = {
+            field: (sum(field_filled(r, field) for r in recipes) / len(recipes)) if recipes else 0
+            for field in RECIPE_FIELDS
+        }
+        stats["completeness"] = statistics.mean(stats["fields"].values())
+    else:
+        stats["items"] = sum(len(r) for r in outputs if isinstance(r, list))
+
+    return stats
+
+def record(url, kind, corpus_dir):
+    scraper = RecipeScraper()
+    content, _ = scraper._fetch(url)
+    slug = re.sub(r'[^a-z0-9]+', '-', url.lower().split('://', 1)[-1]).strip('-')[:80]
+    filename = f"{slug}.html"
+    with open(os.path.join(corpus_dir, filename), 'wb') as f:
+        f.write(content)
+
+    manifest_path = os.path.join(corpus_dir, 'corpus.json')
+    with open(manifest_path, encoding='utf-8') as f:
+        entries = json.load(f)
+    entries = [e for e in entries if e['file'] != filename]
+    entries.append({"file": filename, "url": url, "kind": kind})
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    print(f"Recorded {url} -> {filename} ({len(content)} bytes)")
+
+def print_table(results):
+    print(f"{'strategy':<12}{'pages':>7}{'pages/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'RSS MiB':>9}{'recipes':>9}{'complete':>10}")
+    for r in results:
+        complete = f"{r['completeness'] * 100:.0f}%" if 'completeness' in r else '-'
+        print(f"{r['strategy']:<12}{r['pages']:>7}{r['pages_per_sec']:>10.1f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['peak_rss_kib'] / 1024:>9.1f}{r.get('recipes', '-'):>9}{complete:>10}")
+
+    for r in results:
+        if r.get('fields'):
+            fields = ", ".join(f"{k} {v * 100:.0f}%" for k, v in r['fields'].items())
+            print(f"  {r['strategy']}: {fields}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RecipeScraper benchmark")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), action='append')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help="print raw JSON results")
+    parser.add_argument('--record', metavar='URL', help="download a page into the corpus")
+    parser.add_argument('--kind', choices=('root', 'category', 'recipe'), default='recipe')
+    parser.add_argument('--in-process', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.kind, args.corpus)
+        return 0
+
+    strategies = args.strategy or list(STRATEGIES)
+    if args.in_process:
+        print(json.dumps([run_strategy(name, args.corpus, args.repeat) for name in strategies]))
+        return 0
+
+    results = []
+    for name in strategies:
+        out = subprocess.run(
+            [sys.executable, __file__, '--in-process', '--strategy', name,
+             '--corpus', args.corpus, '--repeat', str(args.repeat)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.extend(json.loads(out.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"corpus: {args.corpus} ({args.repeat} runs per page, parser: {results[0]['parser'] if results else '?'})")
+        print_table(results)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Cold-start benchmark for the Flask backend: how long a fresh worker takes to
+import app.py, build the app and answer its first request, checked against a
+budget, plus the slowest imports as reported by `python -X importtime`.
+
+Usage:
+    python benchmarks/startup_bench.py                 # budget from STARTUP_BUDGET_MS (default 1000)
+    python benchmarks/startup_bench.py --budget 800 --top 20
+    python benchmarks/startup_bench.py --with-db       # also time the first query (needs Postgres)
+
+Every measurement runs in a new interpreter, so nothing is already imported.
+Exits with status 1 when the cold start exceeds the budget.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+# Runs in the child interpreter; prints one JSON line of timings in milliseconds
+COLD_START = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.create_app().test_client()
+created = time.perf_counter()
+client.get('/metrics')
+first = time.perf_counter()
+timings = {
+    "import": (imported - start) * 1000,
+    "create_app": (created - imported) * 1000,
+    "first_request": (first - created) * 1000,
+}
+if '--with-db' in sys.argv:
+    client.get('/api/recipes?limit=1')
+    timings["first_query"] = (time.perf_counter() - first) * 1000
+print(json.dumps(timings))
+"""
+
+def run_python(args):
+    env = dict(os.environ, SCRAPER_CACHE_DIR="off")
+    return subprocess.run([sys.executable] + args, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+
+def cold_start(with_db):
+    result = run_python(["-c", COLD_START] + (["--with-db"] if with_db else []))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    # app.py and Database may print while starting; the timings are the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def import_times():
+    """
+    (self µs, cumulative µs, module) for every module imported by app.py.
+    """
+    result = run_python(["-X", "importtime", "-c", "import app"])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), module.rstrip()))
+    return rows
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Measure backend cold start and import times.")
+    parser.add_argument("--budget", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "1000")),
+                        help="Cold-start budget in milliseconds (import + create_app + first request)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--with-db", action="store_true", help="Also time the first database query")
+    args = parser.parse_args(argv)
+
+    rows = import_times()
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for self_us, cumulative_us, module in sorted(rows, key=lambda row: row[1], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {module}")
+    print(f"{len(rows)} modules, {sum(row[0] for row in rows) / 1000:.1f} ms importing\n")
+
+    timings = cold_start(args.with_db)
+    for phase, elapsed in timings.items():
+        print(f"{phase:<14}{elapsed:>10.1f} ms")
+    total = timings["import"] + timings["create_app"] + timings["first_request"]
+    within = total <= args.budget
+    print(f"{'cold start':<14}{total:>10.1f} ms  (budget {args.budget:.0f} ms: {'ok' if within else 'EXCEEDED'})")
+    return 0 if within else 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
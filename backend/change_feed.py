@@ -0,0 +1,85 @@
+import select
+import threading
+import psycopg2
+
+# Channel the recipes triggers notify on; the payload is the recipe id, or "*"
+# after a TRUNCATE
+CHANNEL = "recipes_changed"
+RELOAD = "*"
+
+class ChangeFeed:
+    """
+    One LISTEN connection per process on the recipes triggers (see
+    Database.create_tables), shared by everything that keeps per-process state
+    derived from the recipes table: the memory index, the suggest index and
+    the in-memory search cache.
+
+    Subscribers get on_change(ids) with the set of changed recipe ids, or None
+    when anything may have changed: right after (re)connecting, since
+    notifications sent while disconnected are lost, and after a TRUNCATE.
+    on_disconnect() is called when the connection drops.
+    """
+    def __init__(self, db):
+        self.db = db
+        self.subscribers = []
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def subscribe(self, on_change, on_disconnect=None):
+        self.subscribers.append((on_change, on_disconnect))
+
+    def start(self):
+        self.thread = threading.Thread(target=self._listen, name="recipes-change-feed", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _connect(self):
+        conn = psycopg2.connect(
+            host=self.db.host,
+            database=self.db.database,
+            user=self.db.user,
+            password=self.db.password,
+            port=self.db.port
+        )
+        conn.autocommit = True
+        return conn
+
+    def _publish(self, ids):
+        for on_change, _ in self.subscribers:
+            try:
+                on_change(ids)
+            except Exception as e:
+                print(f"Change feed subscriber error: {e}")
+
+    def _listen(self):
+        delay = 1
+        while not self.stopped.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                # Resync after LISTEN so no change between the two is missed
+                self._publish(None)
+                delay = 1
+                while not self.stopped.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    payloads = set()
+                    while conn.notifies:
+                        payloads.add(conn.notifies.pop(0).payload)
+                    if payloads:
+                        self._publish(None if RELOAD in payloads else payloads)
+            except Exception as e:
+                for _, on_disconnect in self.subscribers:
+                    if on_disconnect:
+                        on_disconnect()
+                print(f"Change feed error: {e}; reconnecting in {delay}s")
+                self.stopped.wait(delay)
+                delay = min(delay * 2, 60)
+            finally:
+                if conn is not None:
+                    conn.close()
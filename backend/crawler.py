@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from frontier import CrawlFrontier
+
+class CrawlJob:
+    def __init__(self, root_url, max_depth, job_id=None):
+        self.id = job_id or str(uuid.uuid4())
+        self.root_url = root_url
+        self.max_depth = max_depth
+        self.status = "queued"
+        self.categories_scanned = 0
+        self.recipes_found = 0
+        self.recipes_saved = 0
+        self.recipes_changed = 0
+        self.errors = []
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "url": self.root_url,
+            "status": self.status,
+            "categories_scanned": self.categories_scanned,
+            "recipes_found": self.recipes_found,
+            "recipes_saved": self.recipes_saved,
+            "recipes_changed": self.recipes_changed,
+            "errors": self.errors[-20:],
+            "error_count": len(self.errors),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class SiteCrawler:
+    """
+    Server-side whole-site import: root menu -> categories (recursively) -> recipes.
+    Pages are fetched by a bounded worker pool while extracted recipes are
+    buffered and written with save_recipes_bulk every `batch_size` recipes.
+
+    Every discovered URL goes through the persisted CrawlFrontier: a page is
+    fetched at most once per crawl and a crawl interrupted by a restart can be
+    resumed with resume(job_id). Live counters live in this process; run the
+    backend with a single worker (or sticky sessions) to poll a running crawl.
+    """
+    def __init__(self, scraper, db, max_workers=None, batch_size=None, images=None):
+        self.scraper = scraper
+        self.db = db
+        self.images = images
+        self.max_workers = max_workers or int(os.getenv("CRAWL_WORKERS", "8"))
+        self.batch_size = batch_size or int(os.getenv("CRAWL_SAVE_BATCH", "50"))
+        self.frontier = CrawlFrontier(db)
+        self.jobs = {}
+
+    def start(self, root_url, max_depth=3):
+        job = CrawlJob(root_url, max_depth)
+        self.frontier.create_job(job)
+        return self._launch(job)
+
+    def resume(self, job_id, retry_failed=False):
+        """
+        Continues a crawl from its persisted frontier. Returns None if the job is
+        unknown, or the running job if it is already in progress here.
+        """
+        job = self.jobs.get(job_id)
+        if job and job.status in ("queued", "running"):
+            return job
+
+        stored = self.frontier.get_job(job_id)
+        if not stored:
+            return None
+        if retry_failed:
+            self.frontier.retry_failed(job_id)
+        return self._launch(CrawlJob(stored['root_url'], stored['max_depth'], job_id=str(stored['id'])))
+
+    def _launch(self, job):
+        self.jobs[job.id] = job
+        threading.Thread(target=self.run, args=(job,), daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        """
+        The in-memory job, or one rebuilt from the database for crawls started
+        before a restart ("interrupted" if it never finished).
+        """
+        job = self.jobs.get(job_id)
+        if job:
+            return job
+        stored = self.frontier.get_job(job_id)
+        if not stored:
+            return None
+        job = CrawlJob(stored['root_url'], stored['max_depth'], job_id=str(stored['id']))
+        job.status = "interrupted" if stored['status'] in ("queued", "running") else stored['status']
+        return job
+
+    def run(self, job):
+        job.status = "running"
+        job.started_at = time.time()
+        extracted = []
+
+        try:
+            self.frontier.set_job_status(job.id, "running")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                tasks = {}
+
+                def submit(kind, url, depth):
+                    if kind == "root":
+                        future = executor.submit(self._scan_root, url)
+                    elif kind == "category":
+                        future = executor.submit(self._scan_category, url, depth, job.max_depth)
+                    else:
+                        job.recipes_found += 1
+                        future = executor.submit(self._extract_recipe, url)
+                    tasks[future] = (kind, url, depth)
+
+                for kind, url, depth in self.frontier.pending(job.id):
+                    submit(kind, url, depth)
+
+                while tasks:
+                    done, _ = wait(tasks, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        kind, url, depth = tasks.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            if self.frontier.fail(job.id, url, e):
+                                if kind == "recipe":
+                                    job.recipes_found -= 1
+                                submit(kind, url, depth)
+                            else:
+                                job.errors.append(str(e))
+                            continue
+
+                        # Counters are only touched here, in the coordinator thread
+                        if kind == "recipe":
+                            # Marked done once saved, so a crash before the flush refetches it
+                            extracted.append(result)
+                            if len(extracted) >= self.batch_size:
+                                self._save(job, extracted)
+                                extracted = []
+                            continue
+
+                        if kind == "category":
+                            job.categories_scanned += 1
+                        for next_kind, next_url, next_depth in self.frontier.complete(job.id, url, result):
+                            submit(next_kind, next_url, next_depth)
+
+                self._save(job, extracted)
+
+            job.status = "failed" if job.categories_scanned == 0 and job.recipes_saved == 0 and job.errors else "done"
+        except Exception as e:
+            job.errors.append(str(e))
+            job.status = "failed"
+
+        job.finished_at = time.time()
+        try:
+            self.frontier.set_job_status(job.id, job.status)
+        except Exception as e:
+            print(f"Error saving crawl status: {e}")
+        print(f"Crawl {job.id} finished: {job.recipes_saved}/{job.recipes_found} recipes saved, {len(job.errors)} errors")
+
+    def _scan_root(self, url):
+        result = self.scraper.scan_root_categories(url)
+        if isinstance(result, dict) and "error" in result:
+            raise RuntimeError(f"{url}: {result['error']}")
+        return [("category", item['url'], 1) for item in result]
+
+    def _scan_category(self, url, depth, max_depth):
+        result = self.scraper.scan_category(url)
+        if isinstance(result, dict) and "error" in result:
+            raise RuntimeError(f"{url}: {result['error']}")
+
+        follow_ups = []
+        for item in result:
+            if item['type'] == 'recipe':
+                follow_ups.append(("recipe", item['url'], depth))
+            elif depth < max_depth:
+                follow_ups.append(("category", item['url'], depth + 1))
+        return follow_ups
+
+    def _extract_recipe(self, url):
+        # Parsed in the scraper's process pool when PARSE_WORKERS > 1
+        result = self.scraper.extract_pooled(url)
+        if "error" in result:
+            raise RuntimeError(f"{url}: {result['error']}")
+
+        result['url'] = url
+        if self.images:
+            self.images.attach(result)
+        return result
+
+    def _save(self, job, recipes):
+        if not recipes:
+            return
+        changed = set()
+        saved = self.db.save_recipes_bulk(recipes, changed=changed)
+        job.recipes_saved += len(saved)
+        job.recipes_changed += len(changed)
+        for recipe in recipes:
+            if recipe['url'] not in saved:
+                job.errors.append(f"{recipe['url']}: could not save recipe")
+        self.frontier.mark_done(job.id, list(saved))
@@ -1,10 +1,96 @@
+import base64
 import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import pool
+from psycopg2.extensions import cursor as BaseCursor
+from psycopg2.extras import RealDictCursor, Json, execute_values
 from dotenv import load_dotenv
+from fingerprint import recipe_fingerprint
+from dedup import from_bytes, lsh_keys, minhash, recipe_features, similarity, to_bytes
+from ingredients import recipe_terms, stem
+from metrics import DB_QUERY_SECONDS, DB_QUERY_ERRORS, SEARCH_CACHE_TOTAL, SLOW_QUERY_SECONDS, timed
+from query_analysis import ParsedQuery, analyze_query
+from search_cache import SearchCache
+from suggest import SuggestIndex
+from change_feed import CHANNEL, ChangeFeed
+from memory_index import MemoryIndex
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
 
+# Columns returned to the API. Avoids shipping the internal search_vector.
+# created_at is when the recipe was first imported, updated_at when its content last
+# changed and last_checked when a re-crawl last saw it. duplicate_of points to the
+# older recipe a near-duplicate was matched to (see dedup.py).
+RECIPE_FIELDS = (
+    "id", "name", "ingredients", "instructions", "image_url", "image_hash", "source_url",
+    "created_at", "updated_at", "last_checked", "duplicate_of"
+)
+RECIPE_COLUMNS = ", ".join(RECIPE_FIELDS)
+
+# Columns stored in binary snapshots (see snapshot.py): everything except the
+# generated search_vector, so a restore reproduces ids and timestamps.
+SNAPSHOT_FIELDS = RECIPE_FIELDS + ("content_hash",)
+
+# Text search configuration used by the recipes.search_vector column
+SEARCH_CONFIG = "recipes_ca_es"
+
+# Version of the schema create_tables builds. Bump it whenever create_tables
+# changes, so the next migration (python migrate.py, or the first worker to
+# connect when DB_AUTO_MIGRATE is on) applies the change once.
+SCHEMA_VERSION = 3
+# pg_advisory_lock key that serializes migrations across processes
+MIGRATION_LOCK_ID = 0x63686566
+
+# Upsert that leaves the row alone when the content fingerprint is unchanged, so
+# re-crawls do not rewrite every recipe, unless a cached image is now available
+# (image_hash is not part of the fingerprint). created_at keeps the first import time.
+UPSERT_CHANGED = """
+            ON CONFLICT (source_url)
+            DO UPDATE SET
+                name = EXCLUDED.name,
+                ingredients = EXCLUDED.ingredients,
+                instructions = EXCLUDED.instructions,
+                image_url = EXCLUDED.image_url,
+                image_hash = COALESCE(EXCLUDED.image_hash, recipes.image_hash),
+                content_hash = EXCLUDED.content_hash,
+                updated_at = CURRENT_TIMESTAMP,
+                last_checked = CURRENT_TIMESTAMP
+            WHERE recipes.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+               OR (EXCLUDED.image_hash IS NOT NULL AND recipes.image_hash IS DISTINCT FROM EXCLUDED.image_hash)
+"""
+
+class TimedCursorMixin:
+    """
+    Times every execute() into chefbot_db_query_duration_seconds, labelled with the
+    Database operation that opened the cursor, and logs statements slower than
+    SLOW_QUERY_MS. Client-side cursors fetch the whole result inside execute().
+    """
+    query_label = "other"
+
+    def execute(self, query, vars=None):
+        # execute_values passes the composed statement as bytes
+        text = query.decode('utf-8', 'replace') if isinstance(query, bytes) else str(query)
+        describe = lambda: " ".join(text.split())[:200]
+        try:
+            with timed(DB_QUERY_SECONDS, SLOW_QUERY_SECONDS, describe, query=self.query_label):
+                return super().execute(query, vars)
+        except Exception:
+            DB_QUERY_ERRORS.inc(query=self.query_label)
+            raise
+
+_timed_cursor_classes = {}
+
+def timed_cursor_class(cursor_factory):
+    factory = cursor_factory or BaseCursor
+    cls = _timed_cursor_classes.get(factory)
+    if cls is None:
+        cls = type(f"Timed{factory.__name__}", (TimedCursorMixin, factory), {})
+        _timed_cursor_classes[factory] = cls
+    return cls
+
 class Database:
     def __init__(self):
         self.host = os.getenv("DB_HOST", "localhost")
@@ -12,29 +98,280 @@ class Database:
         self.user = os.getenv("DB_USER", "postgres")
         self.password = os.getenv("DB_PASSWORD", "postgres")
         self.port = os.getenv("DB_PORT", "5432")
-        self.conn = None
-        
-        self.connect()
-        self.create_tables()
+
+        # Pool sizing. Each gunicorn worker gets its own pool, so keep max modest.
+        self.pool_min = int(os.getenv("DB_POOL_MIN", "1"))
+        self.pool_max = int(os.getenv("DB_POOL_MAX", "10"))
+        self.pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+        self.bulk_batch_size = int(os.getenv("DB_BULK_BATCH_SIZE", "500"))
+        # Estimated Jaccard similarity above which a new recipe is flagged as a
+        # near-duplicate of an older one; 0 disables the check
+        self.dedup_threshold = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+        # DB_AUTO_MIGRATE=off leaves schema changes to `python migrate.py`, so
+        # workers only check the schema version when they connect
+        self.auto_migrate = os.getenv("DB_AUTO_MIGRATE", "on").lower() in ("on", "1", "true")
+
+        self.pool = None
+        self.has_unaccent = False
+        self.has_trgm = False
+        # Reentrant: preparing a new pool runs queries, which come back through _ensure_pool
+        self._pool_lock = threading.RLock()
+        self._prepared = False
+        self._preparing = False
+        # psycopg2's pool raises instead of waiting when exhausted; the semaphore
+        # makes callers queue for a free connection instead.
+        self._slots = threading.BoundedSemaphore(self.pool_max)
+
+        # Writes made by other processes reach this one through LISTEN/NOTIFY
+        # (change_feed.py); MEMORY_INDEX=on needs it. CHANGE_FEED=off leaves the
+        # suggest index stale until a restart and turns the in-memory search cache off.
+        self.use_memory_index = os.getenv("MEMORY_INDEX", "off").lower() in ("on", "1", "true")
+        self.use_change_feed = self.use_memory_index or os.getenv("CHANGE_FEED", "on").lower() in ("on", "1", "true")
+
+        # Search results cache, invalidated on every write (SEARCH_CACHE=memory|redis|off)
+        self.search_cache = SearchCache.from_env(self.use_change_feed)
+        # Typeahead over names and ingredients, kept in sync by the write methods
+        # below and loaded on the first suggest()
+        self.suggest_index = SuggestIndex()
+        self._suggest_loaded = False
+        self._suggest_lock = threading.Lock()
+        # MEMORY_INDEX=on answers searches and full listings from an in-process
+        # replica kept in sync with LISTEN/NOTIFY (see memory_index.py)
+        self.memory_index = None
+        self.change_feed = None
+
+        # Nothing connects here: the pool is opened, and the schema checked, by
+        # the first query, so importing the app or booting a worker stays cheap
 
     def connect(self):
         try:
-            self.conn = psycopg2.connect(
+            self.pool = pool.ThreadedConnectionPool(
+                self.pool_min,
+                self.pool_max,
                 host=self.host,
                 database=self.database,
                 user=self.user,
                 password=self.password,
                 port=self.port
             )
-            print("Connected to PostgreSQL database")
+            print(f"Connected to PostgreSQL database (pool {self.pool_min}-{self.pool_max})")
         except Exception as e:
             print(f"Error connecting to database: {e}")
-            # Optional: Attempt to create database if it doesn't exist? 
-            # For now, let's assume the DB exists or let the user know.
+            self.pool = None
+
+    def _ensure_pool(self):
+        """
+        Opens the pool on first use (or again if the database was unreachable)
+        and prepares it once per process. Other threads wait until it is ready.
+        Returns True if a pool is available.
+        """
+        if self._prepared:
+            return True
+
+        with self._pool_lock:
+            if self._prepared or self._preparing:
+                return self.pool is not None
+            if self.pool is None:
+                self.connect()
+            if self.pool is None:
+                return False
+            self._preparing = True
+            try:
+                self._prepare()
+            finally:
+                self._preparing = False
+            self._prepared = True
+        return True
+
+    def open(self):
+        """
+        Connects and prepares the pool now instead of on the first query.
+        """
+        return self._ensure_pool()
+
+    def _prepare(self):
+        """
+        Runs once per process on its first connection: migrates the schema if it
+        is behind (and DB_AUTO_MIGRATE allows it), detects the optional
+        extensions and starts the change feed and the memory index.
+        """
+        version = self.schema_version()
+        if version is None or version < SCHEMA_VERSION:
+            if self.auto_migrate:
+                self.migrate()
+            else:
+                print(f"Database schema is at version {version}, expected {SCHEMA_VERSION}: run `python migrate.py`")
+        self._detect_extensions()
+        if self.use_change_feed:
+            self.change_feed = ChangeFeed(self)
+            if self.use_memory_index:
+                self.memory_index = MemoryIndex(self, on_change=self._memory_index_changed)
+                self.change_feed.subscribe(self.memory_index.handle_changes, self.memory_index.disconnected)
+            self.change_feed.subscribe(self._recipes_changed)
+            self.change_feed.start()
+
+    def schema_version(self):
+        """
+        The last migrated schema version, or None for a database never migrated.
+        """
+        try:
+            with self.cursor(query="schema_version") as cur:
+                cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+                if not cur.fetchone()[0]:
+                    return None
+                cur.execute("SELECT max(version) FROM schema_migrations")
+                return cur.fetchone()[0]
+        except Exception as e:
+            print(f"Error reading schema version: {e}")
+            return None
+
+    def _detect_extensions(self):
+        try:
+            with self.cursor(query="detect_extensions") as cur:
+                cur.execute("SELECT extname FROM pg_extension WHERE extname IN ('unaccent', 'pg_trgm')")
+                installed = {row[0] for row in cur.fetchall()}
+            self.has_unaccent = "unaccent" in installed
+            self.has_trgm = "pg_trgm" in installed
+        except Exception as e:
+            print(f"Error detecting extensions: {e}")
+
+    def migrate(self):
+        """
+        Creates or upgrades the schema and backfills derived columns, then
+        records SCHEMA_VERSION. Holds an advisory lock, so when several workers
+        boot against an old schema only the first one migrates.
+        Returns True if the schema is current afterwards.
+        """
+        if not self._ensure_pool():
+            return False
+        # The lock lives on its own connection, outside the pool, so the steps
+        # below can still check out pooled connections with DB_POOL_MAX=1
+        conn = psycopg2.connect(
+            host=self.host,
+            database=self.database,
+            user=self.user,
+            password=self.password,
+            port=self.port
+        )
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+            try:
+                version = self.schema_version()
+                if version is not None and version >= SCHEMA_VERSION:
+                    return True
+                if not self.create_tables():
+                    return False
+                with self.cursor(query="migrate") as cur:
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version) VALUES (%s) ON CONFLICT DO NOTHING",
+                        (SCHEMA_VERSION,)
+                    )
+                print(f"Migrated database schema to version {SCHEMA_VERSION}")
+                return True
+            finally:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+                conn.commit()
+        finally:
+            conn.close()
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        """
+        Takes a connection from the pool, discarding any that fail the health check
+        (e.g. after a Postgres restart) so the pool transparently reconnects.
+        """
+        if not self._ensure_pool():
+            raise psycopg2.OperationalError("No database connection")
+
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            raise pool.PoolError("Timed out waiting for a database connection")
+
+        try:
+            # Every pooled connection may be stale after a restart, so allow one
+            # attempt per slot plus a fresh one.
+            for _ in range(self.pool_max + 1):
+                conn = self.pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                self.pool.putconn(conn, close=True)
+            raise psycopg2.OperationalError("Could not obtain a healthy database connection")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn, broken=False):
+        try:
+            self.pool.putconn(conn, close=broken or bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def cursor(self, cursor_factory=None, name=None, query=None):
+        """
+        Scopes a cursor to a pooled connection for the duration of the block.
+        Commits on success, rolls back on error and always returns the connection.
+        Passing `name` opens a server-side cursor that fetches rows in chunks.
+        `query` labels the statements in the query metrics.
+        """
+        conn = self._checkout()
+        broken = False
+        try:
+            cur = conn.cursor(name=name, cursor_factory=timed_cursor_class(cursor_factory))
+            cur.query_label = query or "other"
+            try:
+                yield cur
+            finally:
+                # Close before committing: a commit invalidates server-side cursors
+                cur.close()
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self._release(conn, broken)
+
+    def _enable_extension(self, name):
+        """
+        Tries to enable a contrib extension. Extensions are optional: managed
+        Postgres images may not ship them, so search degrades instead of failing.
+        """
+        try:
+            with self.cursor(query="enable_extension") as cur:
+                cur.execute(f"CREATE EXTENSION IF NOT EXISTS {name}")
+            return True
+        except Exception as e:
+            print(f"Extension {name} not available: {e}")
+            return False
 
     def create_tables(self):
-        if not self.conn:
-            return
+        """
+        Applies every schema command (all idempotent) and the backfills.
+        Called by migrate(); returns False if the schema could not be created.
+        """
+        if self.pool is None:
+            return False
+
+        self.has_unaccent = self._enable_extension("unaccent")
+        self.has_trgm = self._enable_extension("pg_trgm")
 
         commands = [
             """
@@ -47,189 +384,997 @@ class Database:
                 source_url TEXT UNIQUE,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
+            """,
+            # Language-neutral config: recipes are Catalan, queries are often Spanish,
+            # so we fold accents instead of applying a single-language stemmer.
+            f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{SEARCH_CONFIG}') THEN
+                    CREATE TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} (COPY = simple);
+                END IF;
+            END $$
+            """,
+            f"""
+            ALTER TABLE recipes ADD COLUMN IF NOT EXISTS search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') ||
+                    setweight(jsonb_to_tsvector('{SEARCH_CONFIG}', coalesce(ingredients, '[]'::jsonb), '["string"]'), 'B')
+                ) STORED
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_recipes_search_vector ON recipes USING GIN (search_vector)",
+            # Change tracking for incremental re-crawls
+            """
+            ALTER TABLE recipes
+                ADD COLUMN IF NOT EXISTS content_hash TEXT,
+                ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+                ADD COLUMN IF NOT EXISTS last_checked TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            """,
+            # Content hash of the locally cached copy of image_url (see image_store.py)
+            "ALTER TABLE recipes ADD COLUMN IF NOT EXISTS image_hash TEXT",
+            # Near-duplicate detection: MinHash signature per recipe and its LSH band keys
+            """
+            ALTER TABLE recipes
+                ADD COLUMN IF NOT EXISTS minhash BYTEA,
+                ADD COLUMN IF NOT EXISTS lsh_keys BIGINT[],
+                ADD COLUMN IF NOT EXISTS duplicate_of UUID REFERENCES recipes(id) ON DELETE SET NULL
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_recipes_lsh_keys ON recipes USING GIN (lsh_keys) WITH (fastupdate = off)",
+            # Lets ON DELETE SET NULL find the duplicates of a deleted recipe without a scan
+            "CREATE INDEX IF NOT EXISTS idx_recipes_duplicate_of ON recipes (duplicate_of) WHERE duplicate_of IS NOT NULL",
+            # updated_at is compared with client timestamps (?changed_since), so it is stored
+            # with its time zone; older schemas had a local-time TIMESTAMP
+            """
+            DO $$
+            BEGIN
+                IF (SELECT data_type FROM information_schema.columns
+                    WHERE table_name = 'recipes' AND column_name = 'updated_at') = 'timestamp without time zone' THEN
+                    ALTER TABLE recipes ALTER COLUMN updated_at TYPE TIMESTAMPTZ;
+                END IF;
+            END $$
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_recipes_updated_id ON recipes (updated_at, id)",
+            # Keyset pagination for the recipe listing
+            "CREATE INDEX IF NOT EXISTS idx_recipes_created_id ON recipes (created_at DESC, id DESC)",
+            # Inverted index of canonical ingredient terms for pantry-style queries
+            """
+            CREATE TABLE IF NOT EXISTS recipe_ingredients (
+                recipe_id UUID NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+                term TEXT NOT NULL,
+                PRIMARY KEY (recipe_id, term)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_term ON recipe_ingredients (term, recipe_id)",
+            # Persisted crawl frontier so server-side imports can resume after a restart
+            """
+            CREATE TABLE IF NOT EXISTS crawl_jobs (
+                id UUID PRIMARY KEY,
+                root_url TEXT NOT NULL,
+                max_depth INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS crawl_frontier (
+                job_id UUID NOT NULL REFERENCES crawl_jobs(id) ON DELETE CASCADE,
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                depth INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (job_id, url)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_crawl_frontier_pending ON crawl_frontier (job_id) WHERE status = 'pending'",
+            # The URL as discovered; crawled recipes are saved under it, like /api/extract does
+            "ALTER TABLE crawl_frontier ADD COLUMN IF NOT EXISTS source_url TEXT",
+            # Change feed for per-process state (change_feed.py). Updates notify only
+            # when the content or cached image changed, not on last_checked bumps.
+            f"""
+            CREATE OR REPLACE FUNCTION notify_recipes_changed() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'TRUNCATE' THEN
+                    PERFORM pg_notify('{CHANNEL}', '*');
+                ELSIF TG_OP = 'DELETE' THEN
+                    PERFORM pg_notify('{CHANNEL}', OLD.id::text);
+                ELSE
+                    PERFORM pg_notify('{CHANNEL}', NEW.id::text);
+                END IF;
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql
+            """,
+            """
+            CREATE OR REPLACE TRIGGER recipes_notify_write
+                AFTER INSERT OR DELETE ON recipes
+                FOR EACH ROW EXECUTE FUNCTION notify_recipes_changed()
+            """,
+            """
+            CREATE OR REPLACE TRIGGER recipes_notify_update
+                AFTER UPDATE ON recipes
+                FOR EACH ROW
+                WHEN (OLD.content_hash IS DISTINCT FROM NEW.content_hash
+                      OR OLD.image_hash IS DISTINCT FROM NEW.image_hash
+                      OR OLD.duplicate_of IS DISTINCT FROM NEW.duplicate_of)
+                EXECUTE FUNCTION notify_recipes_changed()
+            """,
+            """
+            CREATE OR REPLACE TRIGGER recipes_notify_truncate
+                AFTER TRUNCATE ON recipes
+                FOR EACH STATEMENT EXECUTE FUNCTION notify_recipes_changed()
+            """,
+            # Schema versions applied by migrate()
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
             """
         ]
+
+        if self.has_unaccent:
+            commands.insert(2, f"""
+            ALTER TEXT SEARCH CONFIGURATION {SEARCH_CONFIG}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple
+            """)
+        if self.has_trgm:
+            commands.append("CREATE INDEX IF NOT EXISTS idx_recipes_name_trgm ON recipes USING GIN (name gin_trgm_ops)")
         
         try:
-            cur = self.conn.cursor()
-            for command in commands:
-                cur.execute(command)
-            cur.close()
-            self.conn.commit()
+            with self.cursor(query="create_tables") as cur:
+                for command in commands:
+                    cur.execute(command)
             print("Tables created successfully")
         except Exception as e:
             print(f"Error creating tables: {e}")
-            if self.conn:
-                self.conn.rollback()
+            return False
 
-    def save_recipe_to_db(self, recipe_data):
+        self._backfill_ingredient_terms()
+        self._backfill_content_hashes()
+        self._backfill_minhashes()
+        return True
+
+    def _backfill_ingredient_terms(self):
         """
-        Saves a recipe to the database.
-        recipe_data should be a dictionary with keys: name, ingredients, instructions, imageUrl, url (source)
+        Indexes ingredient terms for recipes saved before recipe_ingredients existed.
         """
-        if not self.conn:
-            print("No database connection")
-            return None
+        sql = """
+            SELECT id, ingredients FROM recipes r
+            WHERE NOT EXISTS (SELECT 1 FROM recipe_ingredients ri WHERE ri.recipe_id = r.id)
+        """
+        try:
+            with self.cursor(query="backfill_ingredient_terms") as cur:
+                cur.execute(sql)
+                rows = cur.fetchall()
+                self._store_ingredient_terms(cur, rows)
+            if rows:
+                self._invalidate_search_cache()
+                print(f"Indexed ingredient terms for {len(rows)} recipes")
+        except Exception as e:
+            print(f"Error indexing ingredient terms: {e}")
 
-        # Prepare data
-        name = recipe_data.get('name')
-        ingredients = recipe_data.get('ingredients', []) # Make sure this is list before json dumping if needed, but psycopg2 adapts lists to arrays or jsonb?
-        # If using JSONB, passing a python list/dict works with Json adapter or manually dumping.
-        # Let's use json.dumps for safety if not using Json adapter, BUT psycopg2 handles JSONB automatically if we pass valid json-compatible objects usually.
-        # Let's use existing json lib just in case or rely on psycopg2.extras.Json
-        from psycopg2.extras import Json
-        
-        instructions = recipe_data.get('instructions')
-        image_url = recipe_data.get('imageUrl')
-        source_url = recipe_data.get('url')
+    def _backfill_content_hashes(self):
+        """
+        Fingerprints recipes saved before content_hash existed, so the next
+        re-crawl can already skip the unchanged ones.
+        """
+        sql = """
+            SELECT id, name, ingredients, instructions, image_url FROM recipes
+            WHERE content_hash IS NULL
+        """
+        try:
+            with self.cursor(cursor_factory=RealDictCursor, query="backfill_content_hashes") as cur:
+                cur.execute(sql)
+                rows = [
+                    (recipe_fingerprint({
+                        "name": r['name'],
+                        "ingredients": r['ingredients'],
+                        "instructions": r['instructions'],
+                        "imageUrl": r['image_url']
+                    }), r['id'])
+                    for r in cur.fetchall()
+                ]
+                if rows:
+                    execute_values(
+                        cur,
+                        "UPDATE recipes SET content_hash = v.hash FROM (VALUES %s) AS v (hash, id) WHERE recipes.id = v.id::uuid",
+                        rows,
+                        page_size=1000
+                    )
+            if rows:
+                print(f"Fingerprinted {len(rows)} recipes")
+        except Exception as e:
+            print(f"Error fingerprinting recipes: {e}")
+
+    def _store_ingredient_terms(self, cur, recipes):
+        """
+        Replaces the canonical ingredient terms of (recipe_id, ingredients) pairs
+        inside the caller's transaction.
+        """
+        if not recipes:
+            return
+        cur.execute(
+            "DELETE FROM recipe_ingredients WHERE recipe_id = ANY(%s::uuid[])",
+            ([str(recipe_id) for recipe_id, _ in recipes],)
+        )
+        rows = [(recipe_id, term) for recipe_id, ingredients in recipes for term in recipe_terms(ingredients)]
+        if rows:
+            execute_values(
+                cur,
+                "INSERT INTO recipe_ingredients (recipe_id, term) VALUES %s",
+                rows,
+                page_size=1000
+            )
+
+    def _index_duplicates(self, cur, recipes):
+        """
+        Stores MinHash signatures and LSH keys for (recipe_id, recipe) pairs inside
+        the caller's transaction, then flags each recipe whose estimated similarity
+        to an older recipe reaches dedup_threshold. Candidates come from shared LSH
+        keys (a GIN index lookup), so the cost does not grow with the catalogue.
+        Returns a dict mapping duplicate id -> canonical id.
+        """
+        if not self.dedup_threshold or not recipes:
+            return {}
+
+        signatures = {str(recipe_id): minhash(recipe_features(recipe)) for recipe_id, recipe in recipes}
+        ids = list(signatures)
+        keys = {recipe_id: lsh_keys(signature) for recipe_id, signature in signatures.items()}
+        execute_values(
+            cur,
+            """
+            UPDATE recipes SET minhash = v.sig, lsh_keys = v.keys, duplicate_of = NULL
+            FROM (VALUES %s) AS v (id, sig, keys) WHERE recipes.id = v.id
+            """,
+            [(recipe_id, psycopg2.Binary(to_bytes(signatures[recipe_id])), keys[recipe_id]) for recipe_id in ids],
+            template="(%s::uuid, %s, %s::bigint[])",
+            page_size=1000
+        )
+        queries = [(recipe_id, recipe_keys) for recipe_id, recipe_keys in keys.items() if recipe_keys]
+        if not queries:
+            return {}
+
+        # Two recipes are candidates when they share any band key: one GIN lookup each
+        pairs = execute_values(
+            cur,
+            """
+            SELECT q.id::text, r.id::text
+            FROM (VALUES %s) AS q (id, keys)
+            JOIN recipes r ON r.lsh_keys && q.keys AND r.id <> q.id
+            """,
+            queries,
+            template="(%s::uuid, %s::bigint[])",
+            page_size=len(queries),
+            fetch=True
+        )
+        if not pairs:
+            return {}
+
+        cur.execute(
+            "SELECT id::text, minhash, created_at, duplicate_of::text FROM recipes WHERE id = ANY(%s::uuid[])",
+            (list({candidate for _, candidate in pairs} | set(ids)),)
+        )
+        info = {recipe_id: (from_bytes(data), created_at, duplicate_of) for recipe_id, data, created_at, duplicate_of in cur.fetchall()}
 
+        # Only an older recipe (by created_at, then id) can be the canonical copy,
+        # so two new near-duplicates in one batch never point at each other
+        duplicates = {}
+        for recipe_id, candidate in pairs:
+            if recipe_id not in info or candidate not in info:
+                continue
+            signature, created_at, _ = info[recipe_id]
+            other, other_created_at, other_duplicate_of = info[candidate]
+            if other is None or (other_created_at, candidate) >= (created_at, recipe_id):
+                continue
+            score = similarity(signature, other)
+            if score >= self.dedup_threshold and score > duplicates.get(recipe_id, (0, None))[0]:
+                duplicates[recipe_id] = (score, other_duplicate_of or candidate)
+
+        flagged = {}
+        for recipe_id, (_, canonical) in duplicates.items():
+            while canonical in duplicates:
+                canonical = duplicates[canonical][1]
+            flagged[recipe_id] = canonical
+        if flagged:
+            execute_values(
+                cur,
+                "UPDATE recipes SET duplicate_of = v.canonical::uuid FROM (VALUES %s) AS v (id, canonical) WHERE recipes.id = v.id::uuid",
+                list(flagged.items())
+            )
+        return flagged
+
+    def _backfill_minhashes(self, batch_size=500):
+        """
+        Signs recipes saved before near-duplicate detection existed, oldest first,
+        flagging duplicates among them.
+        """
+        if not self.dedup_threshold:
+            return
         sql = """
-            INSERT INTO recipes (name, ingredients, instructions, image_url, source_url)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (source_url) 
-            DO UPDATE SET 
-                name = EXCLUDED.name,
-                ingredients = EXCLUDED.ingredients,
-                instructions = EXCLUDED.instructions,
-                image_url = EXCLUDED.image_url,
-                created_at = CURRENT_TIMESTAMP
+            SELECT id, name, ingredients FROM recipes
+            WHERE minhash IS NULL
+            ORDER BY created_at, id
+            LIMIT %s
+        """
+        signed = flagged = 0
+        try:
+            while True:
+                with self.cursor(query="backfill_minhashes") as cur:
+                    cur.execute(sql, (batch_size,))
+                    rows = cur.fetchall()
+                    if not rows:
+                        break
+                    recipes = [(recipe_id, {"name": name, "ingredients": ingredients}) for recipe_id, name, ingredients in rows]
+                    flagged += len(self._index_duplicates(cur, recipes))
+                signed += len(rows)
+            if signed:
+                # Fresh statistics for the new lsh_keys, so later candidate lookups are
+                # planned on the GIN index rather than on the pre-backfill estimates
+                with self.cursor(query="backfill_minhashes") as cur:
+                    cur.execute("ANALYZE recipes")
+                print(f"Signed {signed} recipes for duplicate detection ({flagged} near-duplicates)")
+        except Exception as e:
+            print(f"Error signing recipes for duplicate detection: {e}")
+
+    def _recipe_row(self, recipe_data):
+        """
+        Maps the API/scraper recipe dict (name, ingredients, instructions, imageUrl, url)
+        to the column order used by the INSERT statements. The scraper already sets
+        contentHash; manual recipes are fingerprinted here.
+        """
+        return (
+            recipe_data.get('name'),
+            Json(recipe_data.get('ingredients', [])),
+            recipe_data.get('instructions'),
+            recipe_data.get('imageUrl'),
+            recipe_data.get('url'),
+            recipe_data.get('contentHash') or recipe_fingerprint(recipe_data),
+            recipe_data.get('imageHash')
+        )
+
+    def save_recipe_to_db(self, recipe_data):
+        """
+        Saves a recipe to the database.
+        recipe_data should be a dictionary with keys: name, ingredients, instructions, imageUrl, url (source)
+        """
+        sql = f"""
+            INSERT INTO recipes (name, ingredients, instructions, image_url, source_url, content_hash, image_hash)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            {UPSERT_CHANGED}
             RETURNING id;
         """
         
         try:
-            cur = self.conn.cursor()
-            cur.execute(sql, (name, Json(ingredients), instructions, image_url, source_url))
-            recipe_id = cur.fetchone()[0]
-            self.conn.commit()
-            cur.close()
+            with self.cursor(query="save_recipe_to_db") as cur:
+                cur.execute(sql, self._recipe_row(recipe_data))
+                row = cur.fetchone()
+                if row is None:
+                    # Same content as the stored version: only record that we saw it
+                    return self._mark_checked(cur, [recipe_data.get('url')])[recipe_data.get('url')]
+                recipe_id = row[0]
+                self._store_ingredient_terms(cur, [(recipe_id, recipe_data.get('ingredients', []))])
+                duplicates = self._index_duplicates(cur, [(recipe_id, recipe_data)])
+            if duplicates:
+                print(f"Recipe {recipe_data.get('name')} looks like a duplicate of {duplicates[str(recipe_id)]}")
+            self._invalidate_search_cache()
+            self.suggest_index.add({
+                "id": recipe_id,
+                "name": recipe_data.get('name'),
+                "ingredients": recipe_data.get('ingredients', [])
+            })
+            self._refresh_memory_index([recipe_id])
             return recipe_id
         except Exception as e:
             print(f"Error saving recipe: {e}")
-            if self.conn:
-                self.conn.rollback()
             return None
 
-    def search_recipes_in_db(self, query):
-        if not self.conn:
-            return []
-            
-        # --- INTERPRETER LOGIC ---
-        # 1. Normalize query
-        raw_query = query.lower().strip()
-        
-        # 2. Tokenize and remove stop words (Spanish/Catalan common words)
-        stop_words = {'la', 'el', 'de', 'con', 'amb', 'i', 'y', 'para', 'per', 'una', 'un', 'receta', 'recepta', 'vull', 'quiero', 'fer', 'hacer', 'tengo', 'tinc'}
-        tokens = [t for t in raw_query.replace(',', ' ').split() if t not in stop_words and len(t) > 2]
-        
-        if not tokens:
-            # Fallback for very short queries or only stopwords
-            tokens = [raw_query]
-
-        print(f"DEBUG: Interpreted tokens: {tokens}")
-
-        # 3. Construct SQL dynamically based on tokens
-        # We want to match ANY of the tokens in the name OR ALL tokens in ingredients if possible.
-        # Strategy:
-        # - Rank 1: Exact matches in Name
-        # - Rank 2: Partial matches in Name
-        # - Rank 3: Matches in Ingredients (for ingredient listings)
-        
-        # Let's simplify: Search for tokens in name OR ingredients.
-        # But for ingredients, we might want to check if ALL tokens exist?
-        # User request: "identificar si el usuario quiere una receta o que a partir de ciertos ingredientes..."
-        
-        # Query construction:
-        # We will search for rows where the NAME matches at least one token
-        # OR where the INGREDIENTS match at least one token.
-        # We can order by the number of matches to surface best results.
-        
-        conditions = []
-        params = []
-        
-        # ILIKE for Name (broad match for the whole query phrase + individual tokens)
-        conditions.append("name ILIKE %s")
-        params.append(f"%{raw_query}%")
-        
-        for token in tokens:
-            # Name match (partial)
-            conditions.append("name ILIKE %s")
-            params.append(f"%{token}%")
-            
-            # Ingredient match (inside JSONB string representation)
-            conditions.append("ingredients::text ILIKE %s")
-            params.append(f"%{token}%")
+    def save_recipes_bulk(self, recipes, batch_size=None, changed=None):
+        """
+        Upserts many recipes with one multi-row INSERT ... ON CONFLICT and one
+        commit per batch, instead of a round trip and fsync per recipe.
+        Every recipe needs a unique 'url' (source_url is the merge key).
+        Unchanged recipes (same content_hash) only get last_checked bumped.
+        Returns a dict mapping source_url -> recipe id for the saved rows,
+        changed or not; pass a `changed` set to collect the urls actually rewritten.
+        """
+        batch_size = batch_size or self.bulk_batch_size
+        saved = {}
+        any_changed = False
+
+        # ON CONFLICT cannot touch the same row twice in one statement, so keep
+        # only the last version of each source_url.
+        unique = {}
+        for recipe_data in recipes:
+            unique[recipe_data.get('url')] = recipe_data
+        recipes = list(unique.values())
 
-        where_clause = " OR ".join(conditions)
-        
         sql = f"""
-            SELECT *, 
-                   (CASE WHEN name ILIKE %s THEN 3 ELSE 0 END) + 
-                   (CASE WHEN ingredients::text ILIKE %s THEN 1 ELSE 0 END) as relevance
-            FROM recipes 
-            WHERE {where_clause}
-            ORDER BY relevance DESC, created_at DESC
-            LIMIT 20
+            INSERT INTO recipes (name, ingredients, instructions, image_url, source_url, content_hash, image_hash)
+            VALUES %s
+            {UPSERT_CHANGED}
+            RETURNING id, source_url
         """
-        
-        # Add params for the ranking clause (exact phrase match + token match?)
-        # To simplify ranking logic in SQL without complex parameter duplication hell:
-        # We'll stick to a simpler query but ensures we catch ingredients keywords.
-        
-        # REVISED SIMPLE QUERY STRATEGY:
-        # Just use the constructed WHERE clause. The OR logic ensures if I search "patata", I get recipes with "patata" in name OR ingredients.
-        
-        sql = f"""
-            SELECT * FROM recipes 
-            WHERE {where_clause}
-            LIMIT 20
+
+        for start in range(0, len(recipes), batch_size):
+            batch = recipes[start:start + batch_size]
+            try:
+                with self.cursor(query="save_recipes_bulk") as cur:
+                    rows = execute_values(
+                        cur, sql, [self._recipe_row(r) for r in batch],
+                        page_size=len(batch), fetch=True
+                    )
+                    ids = dict((source_url, recipe_id) for recipe_id, source_url in rows)
+                    written = [r for r in batch if r.get('url') in ids]
+                    self._store_ingredient_terms(
+                        cur, [(ids[r.get('url')], r.get('ingredients', [])) for r in written]
+                    )
+                    duplicates = self._index_duplicates(cur, [(ids[r.get('url')], r) for r in written])
+                    unchanged = [r.get('url') for r in batch if r.get('url') not in ids]
+                    checked = self._mark_checked(cur, unchanged)
+                if duplicates:
+                    print(f"Flagged {len(duplicates)} near-duplicate recipes")
+                saved.update(ids)
+                saved.update(checked)
+                if changed is not None:
+                    changed.update(ids)
+                any_changed = any_changed or bool(ids)
+                for r in written:
+                    self.suggest_index.add({
+                        "id": ids[r.get('url')],
+                        "name": r.get('name'),
+                        "ingredients": r.get('ingredients', [])
+                    })
+                self._refresh_memory_index(ids.values())
+            except Exception as e:
+                print(f"Error saving recipe batch ({len(batch)} recipes): {e}")
+
+        if any_changed:
+            self._invalidate_search_cache()
+        return saved
+
+    def _mark_checked(self, cur, source_urls):
+        """
+        Bumps last_checked for recipes a re-crawl found unchanged.
+        Returns a dict mapping source_url -> recipe id.
+        """
+        if not source_urls:
+            return {}
+        cur.execute(
+            "UPDATE recipes SET last_checked = CURRENT_TIMESTAMP WHERE source_url = ANY(%s) RETURNING source_url, id",
+            (list(source_urls),)
+        )
+        return dict(cur.fetchall())
+
+    def load_suggest_index(self):
+        """
+        (Re)builds the in-memory typeahead index from the recipes table.
+        """
+        try:
+            self.suggest_index.load(self.iter_recipes(fields=["id", "name", "ingredients"]))
+            self._suggest_loaded = True
+        except Exception as e:
+            print(f"Error loading suggest index: {e}")
+
+    def suggest(self, prefix, limit=10):
+        if not self._suggest_loaded:
+            with self._suggest_lock:
+                if not self._suggest_loaded:
+                    self.load_suggest_index()
+        return self.suggest_index.suggest(prefix, limit)
+
+    def _recipes_changed(self, recipe_ids):
+        """
+        ChangeFeed subscriber: drops the in-memory search cache and applies writes
+        from any process to the suggest index. With MEMORY_INDEX=on the suggest
+        index is updated through _memory_index_changed instead.
+        """
+        # A shared (Redis) cache was already invalidated by the writer
+        if self.search_cache is not None and not self.search_cache.shared:
+            self.search_cache.invalidate()
+        if self.memory_index is not None:
+            return
+        # Waits for a load in progress, which may have read the data before this change
+        with self._suggest_lock:
+            if not self._suggest_loaded:
+                return
+            if recipe_ids is None:
+                # Rebuilt by the next suggest()
+                self._suggest_loaded = False
+                return
+            rows = self.fetch_recipes(recipe_ids)
+            for row in rows:
+                self.suggest_index.add(row)
+            found = {str(row['id']) for row in rows}
+            for recipe_id in recipe_ids:
+                if recipe_id not in found:
+                    self.suggest_index.remove(recipe_id)
+
+    def _memory_index_changed(self, rows, removed_ids):
+        # Changes made by other processes reach this worker's suggest index through the replica
+        if rows is None:
+            self.suggest_index.load(self.memory_index.all_recipes(("id", "name", "ingredients")))
+            self._suggest_loaded = True
+            return
+        for row in rows:
+            self.suggest_index.add(row)
+        for recipe_id in removed_ids:
+            self.suggest_index.remove(recipe_id)
+
+    def _refresh_memory_index(self, recipe_ids):
+        """
+        Applies this process's own writes right away instead of waiting for the
+        notification, so a client reading back its write sees it.
+        """
+        if self.memory_index is None or not self.memory_index.ready or not recipe_ids:
+            return
+        try:
+            self.memory_index.refresh(recipe_ids)
+        except Exception as e:
+            print(f"Error refreshing memory index: {e}")
+
+    def fetch_recipes(self, recipe_ids):
+        """
+        Rows for the given recipe ids (missing ids are skipped).
+        """
+        sql = f"SELECT {RECIPE_COLUMNS} FROM recipes WHERE id = ANY(%s::uuid[])"
+        with self.cursor(cursor_factory=RealDictCursor, query="fetch_recipes") as cur:
+            cur.execute(sql, ([str(recipe_id) for recipe_id in recipe_ids],))
+            return cur.fetchall()
+
+    def list_duplicates(self):
+        """
+        Recipes flagged as near-duplicates, with the recipe each one duplicates.
+        """
+        sql = """
+            SELECT d.id, d.name, d.source_url, d.created_at,
+                   c.id AS duplicate_of, c.name AS duplicate_of_name, c.source_url AS duplicate_of_url
+            FROM recipes d
+            JOIN recipes c ON c.id = d.duplicate_of
+            ORDER BY d.created_at DESC
         """
-        
         try:
-            cur = self.conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute(sql, tuple(params))
+            with self.cursor(cursor_factory=RealDictCursor, query="list_duplicates") as cur:
+                cur.execute(sql)
+                return cur.fetchall()
+        except Exception as e:
+            print(f"Error listing duplicates: {e}")
+            return []
+
+    def clear_duplicate(self, recipe_id):
+        """
+        Unflags a recipe wrongly matched as a near-duplicate. It is checked again
+        only if its content changes.
+        """
+        try:
+            with self.cursor(query="clear_duplicate") as cur:
+                cur.execute("UPDATE recipes SET duplicate_of = NULL WHERE id = %s AND duplicate_of IS NOT NULL", (recipe_id,))
+                updated = cur.rowcount
+            if updated:
+                self._invalidate_search_cache()
+                self._refresh_memory_index([recipe_id])
+            return updated > 0
+        except Exception as e:
+            print(f"Error clearing duplicate flag: {e}")
+            return False
+
+    def recipes_missing_images(self, limit=100, after_id=None):
+        """
+        (id, image_url) of recipes whose image has not been cached locally yet,
+        in id order starting after `after_id`.
+        """
+        sql = """
+            SELECT id, image_url FROM recipes
+            WHERE image_hash IS NULL AND coalesce(image_url, '') <> ''
+              AND (%s::uuid IS NULL OR id > %s::uuid)
+            ORDER BY id
+            LIMIT %s
+        """
+        try:
+            with self.cursor(query="recipes_missing_images") as cur:
+                cur.execute(sql, (after_id, after_id, limit))
+                return cur.fetchall()
+        except Exception as e:
+            print(f"Error listing recipes without cached images: {e}")
+            return []
+
+    def set_image_hashes(self, hashes):
+        """
+        Stores image hashes from a list of (recipe_id, image_hash) pairs.
+        """
+        if not hashes:
+            return
+        with self.cursor(query="set_image_hashes") as cur:
+            execute_values(
+                cur,
+                "UPDATE recipes SET image_hash = v.hash FROM (VALUES %s) AS v (id, hash) WHERE recipes.id = v.id::uuid",
+                [(str(recipe_id), image_hash) for recipe_id, image_hash in hashes]
+            )
+        self._invalidate_search_cache()
+        self._refresh_memory_index([recipe_id for recipe_id, _ in hashes])
+
+    def _invalidate_search_cache(self):
+        if self.search_cache is not None:
+            self.search_cache.invalidate()
+
+    def _cached_query(self, cache_key, sql, params, query="search"):
+        """
+        Runs a read-only search query through the search cache. Only successful
+        results are cached; errors propagate to the caller.
+        """
+        if self.search_cache is not None:
+            results, generation = self.search_cache.get(cache_key)
+            SEARCH_CACHE_TOTAL.inc(result="miss" if results is None else "hit")
+            if results is not None:
+                return results
+
+        with self.cursor(cursor_factory=RealDictCursor, query=query) as cur:
+            cur.execute(sql, params)
             results = cur.fetchall()
-            cur.close()
-            return results
+
+        if self.search_cache is not None:
+            self.search_cache.set(cache_key, results, generation)
+        return results
+
+    def search_recipes_in_db(self, query):
+        """
+        Full-text search by dish name and ingredients. `query` is a string or a
+        ParsedQuery from query_analysis.analyze_query.
+        """
+        parsed = query if isinstance(query, ParsedQuery) else analyze_query(query)
+
+        if self._use_memory_index():
+            lexemes = self._search_lexemes(parsed)
+            return self.memory_index.search_text(lexemes) if lexemes else []
+
+        search = self._text_search_query(parsed)
+        if search is None:
+            return []
+        try:
+            return self._cached_query(*search, query="search_text")
         except Exception as e:
             print(f"Error searching recipes: {e}")
             return []
+
+    def _use_memory_index(self):
+        return self.memory_index is not None and self.memory_index.ready
+
+    def _search_lexemes(self, parsed):
+        lexemes = list(parsed.terms)
+        if not self.has_unaccent:
+            # The index keeps accents, so also search the accented forms ("pèsols")
+            lexemes.extend(stem(token) for token in parsed.tokens)
+        return list(dict.fromkeys(lexemes))
+
+    def _text_search_query(self, parsed):
+        """
+        Builds (cache_key, sql, params) for a text search, or None if the query
+        has no searchable terms. Shared with the async API.
+        """
+        # Prefix tsquery over stemmed terms so "patates" matches "patata" and "patates".
+        # Any term may match (OR); ts_rank rewards rows matching more of them,
+        # and name hits (weight A) outrank ingredient hits (weight B).
+        lexemes = self._search_lexemes(parsed)
+        ts_query = " | ".join(f"{lexeme}:*" for lexeme in lexemes)
+
+        if not ts_query:
+            return None
+
+        cache_key = SearchCache.key("text", lexemes)
+
+        # Trigram similarity catches typos in the dish name ("pollastre al forn"), so
+        # it compares the name with what was typed, not with the stems, which lose
+        # accents, stop words and word endings
+        if self.has_trgm:
+            typed = " ".join(parsed.raw.lower().split())
+            # Ranking also depends on the typed words, not just on the lexeme set
+            cache_key = f"{cache_key}|{typed}"
+            sql = f"""
+                SELECT {RECIPE_COLUMNS},
+                       ts_rank(search_vector, q) + similarity(name, %s) AS relevance
+                FROM recipes, to_tsquery('{SEARCH_CONFIG}', %s) q
+                WHERE (search_vector @@ q OR name %% %s) AND duplicate_of IS NULL
+                ORDER BY relevance DESC, created_at DESC
+                LIMIT 20
+            """
+            params = [typed, ts_query, typed]
+        else:
+            sql = f"""
+                SELECT {RECIPE_COLUMNS},
+                       ts_rank(search_vector, q) AS relevance
+                FROM recipes, to_tsquery('{SEARCH_CONFIG}', %s) q
+                WHERE search_vector @@ q AND duplicate_of IS NULL
+                ORDER BY relevance DESC, created_at DESC
+                LIMIT 20
+            """
+            params = [ts_query]
+        return cache_key, sql, tuple(params)
             
-    def get_all_recipes(self):
-        if not self.conn:
+    def search_recipes_by_ingredients(self, query):
+        """
+        Pantry-style search ("tinc ou, patata i ceba"): ranks recipes by how many
+        of the given ingredients they use, then by how few other ingredients they need.
+        """
+        parsed = query if isinstance(query, ParsedQuery) else analyze_query(query)
+        if self._use_memory_index():
+            terms = parsed.ingredient_terms
+            return self.memory_index.search_ingredients(terms) if terms else []
+
+        search = self._ingredient_search_query(parsed)
+        if search is None:
             return []
-            
-        sql = "SELECT * FROM recipes ORDER BY created_at DESC"
-        
         try:
-            cur = self.conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute(sql)
-            results = cur.fetchall()
-            cur.close()
+            return self._cached_query(*search, query="search_ingredients")
+        except Exception as e:
+            print(f"Error searching recipes by ingredients: {e}")
+            return []
+
+    def _ingredient_search_query(self, parsed):
+        """
+        Builds (cache_key, sql, params) for an ingredient search, or None.
+        """
+        terms = parsed.ingredient_terms
+        if not terms:
+            return None
+
+        sql = f"""
+            SELECT {RECIPE_COLUMNS},
+                   count(*) AS matched_ingredients,
+                   count(*)::float / %s AS coverage
+            FROM recipe_ingredients ri
+            JOIN recipes r ON r.id = ri.recipe_id
+            WHERE ri.term = ANY(%s) AND r.duplicate_of IS NULL
+            GROUP BY r.id
+            ORDER BY matched_ingredients DESC,
+                     jsonb_array_length(coalesce(r.ingredients, '[]'::jsonb)) ASC,
+                     r.created_at DESC
+            LIMIT 20
+        """
+        return SearchCache.key("ingredients", terms), sql, (len(terms), list(terms))
+
+    def get_all_recipes(self, fields=None):
+        sql = f"SELECT {self._projection(fields)} FROM recipes ORDER BY created_at DESC"
+        if self._use_memory_index():
+            return self.memory_index.all_recipes([f for f in RECIPE_FIELDS if not fields or f in fields])
+
+        try:
+            with self.cursor(cursor_factory=RealDictCursor, query="get_all_recipes") as cur:
+                cur.execute(sql)
+                results = cur.fetchall()
             return results
         except Exception as e:
             print(f"Error getting recipes: {e}")
             return []
 
+    def _projection(self, fields):
+        """
+        Validates a requested field list against RECIPE_FIELDS. Returns the SQL column list.
+        """
+        if not fields:
+            return RECIPE_COLUMNS
+        unknown = [f for f in fields if f not in RECIPE_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return ", ".join(f for f in RECIPE_FIELDS if f in fields)
+
+    def _encode_cursor(self, timestamp, recipe_id):
+        raw = f"{timestamp.isoformat()}|{recipe_id}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def _decode_cursor(self, cursor):
+        try:
+            timestamp, recipe_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+            return datetime.fromisoformat(timestamp), recipe_id
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    def list_recipes(self, limit=50, cursor=None, fields=None):
+        """
+        Keyset-paginated listing, newest first. Each page is an index range scan on
+        (created_at, id), so deep pages cost the same as the first one.
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        """
+        sql, params = self._list_query(limit, cursor, fields)
+        with self.cursor(cursor_factory=RealDictCursor, query="list_recipes") as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        return self._paginate(rows, limit)
+
+    def _list_query(self, limit, cursor, fields):
+        columns = self._projection(fields)
+        params = []
+        where = ""
+        if cursor:
+            where = "WHERE (created_at, id) < (%s::timestamp, %s::uuid)"
+            params.extend(self._decode_cursor(cursor))
+        params.append(limit + 1)
+
+        # created_at and id are always needed to build the next cursor
+        sql = f"""
+            SELECT {columns}, created_at AS _cursor_ts, id AS _cursor_id
+            FROM recipes
+            {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+        """
+        return sql, tuple(params)
+
+    def _paginate(self, rows, limit):
+        """
+        Trims the extra row fetched by a keyset query and turns the last row's
+        (_cursor_ts, _cursor_id) into next_cursor. Returns (rows, next_cursor).
+        """
+        rows = [dict(row) for row in rows]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = self._encode_cursor(last['_cursor_ts'], last['_cursor_id'])
+        for row in rows:
+            del row['_cursor_ts']
+            del row['_cursor_id']
+        return rows, next_cursor
+
+    def list_changed_since(self, since, limit=500, cursor=None, fields=None):
+        """
+        Recipes whose content changed after `since` (a datetime), oldest change first,
+        so a consumer can sync incrementally. Paginated like list_recipes.
+        Returns (rows, next_cursor).
+        """
+        sql, params = self._changed_since_query(since, limit, cursor, fields)
+        with self.cursor(cursor_factory=RealDictCursor, query="list_changed_since") as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        return self._paginate(rows, limit)
+
+    def _changed_since_query(self, since, limit, cursor, fields):
+        columns = self._projection(fields)
+        if cursor:
+            where = "WHERE (updated_at, id) > (%s::timestamptz, %s::uuid)"
+            params = list(self._decode_cursor(cursor))
+        else:
+            where = "WHERE updated_at > %s"
+            params = [since]
+        params.append(limit + 1)
+
+        sql = f"""
+            SELECT {columns}, updated_at AS _cursor_ts, id AS _cursor_id
+            FROM recipes
+            {where}
+            ORDER BY updated_at, id
+            LIMIT %s
+        """
+        return sql, tuple(params)
+
+    def iter_recipes(self, fields=None, batch_size=1000):
+        """
+        Streams every recipe through a server-side cursor, holding at most
+        `batch_size` rows in memory. Used for exports.
+        Fields are validated up front so bad requests fail before streaming starts.
+        """
+        columns = self._projection(fields)
+        sql = f"SELECT {columns} FROM recipes ORDER BY created_at DESC, id DESC"
+
+        def rows():
+            with self.cursor(cursor_factory=RealDictCursor, name="recipes_export", query="iter_recipes") as cur:
+                cur.itersize = batch_size
+                cur.execute(sql)
+                for row in cur:
+                    yield row
+
+        return rows()
+
+    def iter_snapshot_rows(self, batch_size=1000):
+        """
+        Streams every recipe as a tuple in SNAPSHOT_FIELDS order, oldest first.
+        """
+        sql = f"SELECT {', '.join(SNAPSHOT_FIELDS)} FROM recipes ORDER BY created_at, id"
+        with self.cursor(name="recipes_snapshot", query="iter_snapshot_rows") as cur:
+            cur.itersize = batch_size
+            cur.execute(sql)
+            for row in cur:
+                yield row
+
+    def restore_recipes(self, rows):
+        """
+        Upserts snapshot rows (dicts keyed by SNAPSHOT_FIELDS) in one transaction,
+        keeping their ids and timestamps. Rows whose content_hash matches the
+        stored recipe are left alone. Returns the number of rows written.
+        """
+        if not rows:
+            return 0
+
+        unique = {}
+        for row in rows:
+            unique[row.get('source_url')] = row
+        values = [
+            (
+                row.get('id'),
+                row.get('name'),
+                Json(row.get('ingredients') or []),
+                row.get('instructions'),
+                row.get('image_url'),
+                row.get('image_hash'),
+                row.get('source_url'),
+                row.get('content_hash') or recipe_fingerprint({
+                    "name": row.get('name'),
+                    "ingredients": row.get('ingredients'),
+                    "instructions": row.get('instructions'),
+                    "imageUrl": row.get('image_url')
+                }),
+                row.get('created_at'),
+                row.get('updated_at'),
+                row.get('last_checked')
+            )
+            for row in unique.values()
+        ]
+        sql = """
+            INSERT INTO recipes (id, name, ingredients, instructions, image_url, image_hash,
+                                 source_url, content_hash, created_at, updated_at, last_checked)
+            VALUES %s
+            ON CONFLICT (source_url)
+            DO UPDATE SET
+                name = EXCLUDED.name,
+                ingredients = EXCLUDED.ingredients,
+                instructions = EXCLUDED.instructions,
+                image_url = EXCLUDED.image_url,
+                image_hash = COALESCE(EXCLUDED.image_hash, recipes.image_hash),
+                content_hash = EXCLUDED.content_hash,
+                updated_at = EXCLUDED.updated_at,
+                last_checked = GREATEST(recipes.last_checked, EXCLUDED.last_checked)
+            WHERE recipes.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            RETURNING id, name, ingredients
+        """
+        template = (
+            "(COALESCE(%s::uuid, gen_random_uuid()), %s, %s, %s, %s, %s, %s, %s, "
+            "COALESCE(%s, CURRENT_TIMESTAMP), COALESCE(%s, CURRENT_TIMESTAMP), COALESCE(%s, CURRENT_TIMESTAMP))"
+        )
+        try:
+            with self.cursor(query="restore_recipes") as cur:
+                written = execute_values(cur, sql, values, template=template, page_size=len(values), fetch=True)
+                self._store_ingredient_terms(cur, [(recipe_id, ingredients) for recipe_id, _, ingredients in written])
+                self._index_duplicates(
+                    cur, [(recipe_id, {"name": name, "ingredients": ingredients}) for recipe_id, name, ingredients in written]
+                )
+        except Exception as e:
+            # Earlier blocks are already committed; fail the import rather than
+            # report a short count
+            print(f"Error restoring recipe batch ({len(values)} recipes): {e}")
+            raise
+
+        if written:
+            self._invalidate_search_cache()
+            for recipe_id, name, ingredients in written:
+                self.suggest_index.add({"id": recipe_id, "name": name, "ingredients": ingredients})
+            self._refresh_memory_index([recipe_id for recipe_id, _, _ in written])
+        return len(written)
+
     def close(self):
-        if self.conn:
-            self.conn.close()
+        if self.change_feed is not None:
+            self.change_feed.stop()
+            self.change_feed = None
+        self.memory_index = None
+        with self._pool_lock:
+            if self.pool is not None:
+                self.pool.closeall()
+                self.pool = None
+            self._prepared = False
 
     def delete_recipe(self, recipe_id):
-        if not self.conn:
-            return False
-            
         sql = "DELETE FROM recipes WHERE id = %s"
         
         try:
-            cur = self.conn.cursor()
-            cur.execute(sql, (recipe_id,))
-            rows_deleted = cur.rowcount
-            self.conn.commit()
-            cur.close()
+            with self.cursor(query="delete_recipe") as cur:
+                cur.execute(sql, (recipe_id,))
+                rows_deleted = cur.rowcount
+            if rows_deleted:
+                self._invalidate_search_cache()
+                self.suggest_index.remove(recipe_id)
+                self._refresh_memory_index([recipe_id])
             return rows_deleted > 0
         except Exception as e:
             print(f"Error deleting recipe: {e}")
-            if self.conn:
-                self.conn.rollback()
             return False
 
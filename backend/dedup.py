@@ -0,0 +1,80 @@
+import hashlib
+import sys
+from array import array
+from ingredients import fold_accents, recipe_terms, stem
+from query_analysis import STOP_WORDS
+
+# 24 bands of 5 rows: pairs with Jaccard similarity ~0.5 have about even odds
+# of sharing a band, pairs above 0.8 almost always do and pairs below 0.3 rarely.
+NUM_PERM = 120
+BANDS = 24
+ROWS = NUM_PERM // BANDS
+
+_HASH_BYTES = NUM_PERM * 4
+
+def recipe_features(recipe):
+    """
+    Shingles describing a dish: stemmed words of its name and its canonical
+    ingredient terms, so "Truita de patates" and "Truita de patata" with the same
+    ingredient list share every feature.
+    """
+    features = set()
+    words = [stem(word) for word in fold_accents(recipe.get('name') or '').split()
+             if word.isalpha() and word not in STOP_WORDS]
+    features.update(f"n:{word}" for word in words)
+    features.update(f"n:{a} {b}" for a, b in zip(words, words[1:]))
+    features.update(f"i:{term}" for term in recipe_terms(recipe.get('ingredients')))
+    return features
+
+def _feature_hashes(feature):
+    # SHAKE-128 output read as NUM_PERM independent 32-bit hashes of the feature,
+    # computed in one C call instead of NUM_PERM modular multiplications
+    hashes = array('I')
+    hashes.frombytes(hashlib.shake_128(feature.encode('utf-8')).digest(_HASH_BYTES))
+    if sys.byteorder == 'big':
+        hashes.byteswap()
+    return hashes
+
+def minhash(features):
+    """
+    MinHash signature of a feature set as an array of NUM_PERM uint32 values,
+    or None for an empty set.
+    """
+    if not features:
+        return None
+    hashes = [_feature_hashes(feature) for feature in features]
+    if len(hashes) == 1:
+        return hashes[0]
+    return array('I', map(min, *hashes))
+
+def lsh_keys(signature):
+    """
+    One signed 64-bit key per band, hashed together with the band number so keys
+    from different bands never collide. Two recipes are duplicate candidates when
+    they share at least one key.
+    """
+    if signature is None:
+        return []
+    keys = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(chunk.tobytes(), digest_size=8, salt=band.to_bytes(2, 'big')).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+def similarity(a, b):
+    """
+    Estimated Jaccard similarity of two signatures.
+    """
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+def to_bytes(signature):
+    # Empty bytes mark a recipe that was processed but has no features
+    return signature.tobytes() if signature is not None else b""
+
+def from_bytes(data):
+    if not data:
+        return None
+    signature = array('I')
+    signature.frombytes(bytes(data))
+    return signature
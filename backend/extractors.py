@@ -0,0 +1,195 @@
+# Bump scraper.PARSE_VERSION whenever an extractor changes its output, so results
+# cached for unchanged pages are extracted again.
+import re
+from urllib.parse import urljoin, urlsplit
+
+# Section headers of kilometre0.cat recipes. One pass over the lowercased header
+# text; the branches are tried in order, so "ingredients" wins over "preparació"
+# when a header mentions both, as the old if/elif chain did.
+SECTION_HEADER_RE = re.compile(
+    r"(?=.*?(?P<ingredients>gredients))"
+    r"|(?=.*?(?P<instructions>preparaci|elaboraci))"
+    r"|(?=.*?(?P<guarnicio>guarnici))"
+    r"|(?=.*?(?P<estris>estris))"
+    r"|(?=.*?(?P<ampliacio>ampliaci))",
+    re.S
+)
+INGREDIENTS_HEADER_RE = re.compile(r"gredients", re.I)
+IMAGE_NOISE_RE = re.compile(r"logo|icon|print|email|spacer|pixel|facebook|twitter")
+
+# Precompiled find() arguments
+HEADLINE_ATTRS = {"itemprop": "headline"}
+ARTICLE_BODY_ATTRS = {"itemprop": "articleBody"}
+BLOCK_TAGS = ['p', 'h3', 'h4', 'h5', 'ul', 'ol', 'div']
+HEADER_TAGS = frozenset({'h3', 'h4', 'h5'})
+EMPHASIS_TAGS = ['strong', 'b']
+
+def section_header(text):
+    """
+    Returns the section key named by a header text, or None.
+    """
+    match = SECTION_HEADER_RE.match(text.lower())
+    if not match:
+        return None
+    return next(key for key, value in match.groupdict().items() if value is not None)
+
+class SiteExtractor:
+    """
+    Base class for site-specific recipe extractors.
+
+    `hosts` are the hostnames the extractor handles. `skip` lists the generic
+    strategies RecipeScraper should not try for those pages ("json_ld",
+    "fallback_parser"), so known sites don't pay for strategies that never work there.
+    extract(soup, url) returns a recipe dict or None to fall through.
+    """
+    hosts = ()
+    skip = frozenset()
+
+    def extract(self, soup, url):
+        raise NotImplementedError
+
+class Kilometre0Extractor(SiteExtractor):
+    """
+    Robust extraction for kilometre0.cat using a forward-scanning state machine approach.
+    Fixes fragmented headers (IN-GREDIENTS) and nested P tags.
+    """
+    hosts = ('kilometre0.cat',)
+    # The site has no JSON-LD; the custom parser already handles every page
+    skip = frozenset({'json_ld'})
+    base_url = "https://www.kilometre0.cat"
+
+    def extract(self, soup, url=None):
+        try:
+            recipe = {
+                "name": "Sense títol",
+                "ingredients": [],
+                "instructions": "",
+                "imageUrl": ""
+            }
+
+            # 1. Title
+            # Priority: itemprop="headline" > h2 inside page-header > h2 itemprop="name"
+            title_node = soup.find(attrs=HEADLINE_ATTRS)
+            if not title_node:
+                header_div = soup.find('div', class_='page-header')
+                if header_div:
+                    title_node = header_div.find('h2')
+            if not title_node:
+                title_node = soup.find('h2', itemprop="name")
+
+            if title_node:
+                recipe['name'] = title_node.get_text(strip=True)
+
+            # 2. Main Content Scanning
+            # Try to find the main container. Usually itemprop="articleBody" or class="item-page"
+            article_body = soup.find(attrs=ARTICLE_BODY_ATTRS)
+            if not article_body:
+                article_body = soup.find('div', class_='item-page')
+
+            if article_body:
+                sections = {"intro": [], "ingredients": [], "instructions": [], "guarnicio": [], "estris": [], "ampliacio": []}
+                current_section = "intro"
+
+                # Direct children in document order; recurse only if the structure is flat
+                elements = article_body.find_all(BLOCK_TAGS, recursive=False)
+                if not elements or len(elements) < 3:
+                    elements = article_body.find_all(BLOCK_TAGS)
+
+                for element in elements:
+                    # Text with newlines for <br>; computed once and reused for header detection
+                    content_text = element.get_text(separator='\n', strip=True)
+                    if not content_text:
+                        continue
+
+                    header_key = None
+                    if element.name in HEADER_TAGS:
+                        header_key = section_header(content_text)
+                    else:
+                        # Check STRONGS inside P/DIV
+                        strong = element.find(EMPHASIS_TAGS)
+                        if strong:
+                            s_text = strong.get_text(strip=True)
+                            if len(s_text) > 3:  # Avoid noise
+                                header_key = section_header(s_text)
+
+                    if header_key:
+                        current_section = header_key
+                    else:
+                        sections[current_section].append(content_text)
+
+                # 3. Process Sections
+
+                # Ingredients: join all text blocks, then split by newlines
+                clean_ings = []
+                for line in "\n".join(sections["ingredients"]).split('\n'):
+                    line = line.strip()
+                    # Filter out header noise if it crept in
+                    if len(line) < 2 or INGREDIENTS_HEADER_RE.search(line):
+                        continue
+                    clean_ings.append(line)
+                recipe['ingredients'] = clean_ings
+
+                # Instructions, with the extra sections appended
+                instr_parts = sections["instructions"]
+                if sections["guarnicio"]:
+                    instr_parts.append("\n--- GUARNICIÓ ---\n" + "\n".join(sections["guarnicio"]))
+                if sections["estris"]:
+                    instr_parts.append("\n--- ESTRIS ---\n" + "\n".join(sections["estris"]))
+                if sections["ampliacio"]:
+                    instr_parts.append("\n--- AMPLIACIÓ ---\n" + "\n".join(sections["ampliacio"]))
+
+                recipe['instructions'] = "\n".join(instr_parts)
+
+            # 4. Image Extraction
+            # Priority 1: Meta Tag og:image (Usually most reliable for social sharing)
+            meta_img = soup.find("meta", property="og:image")
+            if meta_img and meta_img.get("content"):
+                recipe['imageUrl'] = urljoin(self.base_url, meta_img.get("content"))
+            else:
+                # Priority 2: Image inside articleBody (usually the main recipe photo)
+                images = article_body.find_all('img') if article_body else []
+
+                # Priority 3: Fallback to any images in main content area
+                if not images:
+                    main_area = soup.find('div', class_='item-page') or soup.find('main')
+                    if main_area:
+                        images = main_area.find_all('img')
+
+                for img in images:
+                    lower_src = img.get('src', '').lower()
+                    # Skip logos, icons, print buttons, spacers; recipe photos live under images/
+                    if lower_src and not IMAGE_NOISE_RE.search(lower_src) and 'images/' in lower_src:
+                        recipe['imageUrl'] = urljoin(self.base_url, img.get('src'))
+                        break
+
+            return recipe
+
+        except Exception as e:
+            # Fallback to JSON-LD if custom parsing fails
+            print(f"Custom extraction failed: {e}")
+            return None
+
+class ExtractorRegistry:
+    """
+    Maps hostnames to site extractors. Lookup is a dict hit on the host (and on
+    the host without "www."), so adding sites does not slow down dispatch.
+    """
+    def __init__(self, extractors=()):
+        self.by_host = {}
+        for extractor in extractors:
+            self.register(extractor)
+
+    def register(self, extractor):
+        for host in extractor.hosts:
+            self.by_host[host.lower()] = extractor
+        return extractor
+
+    def for_url(self, url):
+        host = (urlsplit(url).hostname or '').lower()
+        extractor = self.by_host.get(host)
+        if extractor is None and host.startswith('www.'):
+            extractor = self.by_host.get(host[4:])
+        return extractor
+
+def default_registry():
+    return ExtractorRegistry([Kilometre0Extractor()])
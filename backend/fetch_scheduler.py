@@ -0,0 +1,239 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+import requests
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Responses that mean the host wants us to slow down
+THROTTLE_STATUSES = {429, 503}
+
+class HostState:
+    """
+    Politeness state for one host: concurrency cap, token bucket and metrics.
+    Guarded by its own condition variable so hosts never block each other.
+    """
+    def __init__(self, rate, burst, max_concurrency):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self.crawl_delay = None
+        self.cond = threading.Condition()
+        # Set once robots.txt has been read, so no request slips in before Crawl-delay applies
+        self.ready = threading.Event()
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def acquire(self):
+        start = time.monotonic()
+        with self.cond:
+            self.waiting += 1
+            while True:
+                now = time.monotonic()
+                if self.in_flight >= self.max_concurrency:
+                    self.cond.wait()
+                    continue
+                if self.paused_until > now:
+                    self.cond.wait(self.paused_until - now)
+                    continue
+                if self.rate <= 0:
+                    break
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                self.cond.wait((1 - self.tokens) / self.rate)
+            self.waiting -= 1
+            self.in_flight += 1
+            self.requests += 1
+
+            waited = time.monotonic() - start
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def count(self, counter):
+        with self.cond:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def throttle(self, delay):
+        """
+        The host pushed back: halve the rate and pause every request to it for `delay`.
+        """
+        with self.cond:
+            self.throttled += 1
+            if self.rate > 0:
+                self.rate = max(self.base_rate / 16, self.rate / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    def recover(self):
+        # Additive increase back towards the configured rate after each success
+        if self.rate < self.base_rate:
+            with self.cond:
+                self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+    def set_crawl_delay(self, delay):
+        with self.cond:
+            self.crawl_delay = delay
+            if delay:
+                limit = 1.0 / delay
+                self.base_rate = min(self.base_rate, limit) if self.base_rate > 0 else limit
+                self.rate = min(self.rate, self.base_rate) if self.rate > 0 else self.base_rate
+                self.burst = 1
+                self.tokens = min(self.tokens, 1)
+
+    def to_dict(self):
+        with self.cond:
+            return {
+                "in_flight": self.in_flight,
+                "queued": self.waiting,
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "errors": self.errors,
+                "rate": self.rate,
+                "crawl_delay": self.crawl_delay,
+                "avg_wait_ms": self.wait_total / self.requests * 1000 if self.requests else 0,
+                "max_wait_ms": self.wait_max * 1000
+            }
+
+class FetchScheduler:
+    """
+    Request scheduler under RecipeScraper. Every fetch goes through its host's
+    HostState: at most `max_concurrency` requests in flight, a token bucket of
+    `rate` requests/s (slowed further by robots.txt Crawl-delay) and retries
+    with exponential backoff and full jitter on 429/5xx and network errors.
+    A 429/503 also halves the host's rate, which then creeps back up on success.
+    """
+    def __init__(self, session, rate=None, burst=None, max_concurrency=None, max_retries=None,
+                 backoff_base=None, backoff_max=None, timeout=None, respect_robots=None):
+        self.session = session
+        self.rate = rate if rate is not None else float(os.getenv("CRAWL_RATE", "4"))
+        self.burst = burst or float(os.getenv("CRAWL_BURST", "2"))
+        self.max_concurrency = max_concurrency or int(os.getenv("CRAWL_HOST_CONCURRENCY", "4"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("CRAWL_MAX_RETRIES", "3"))
+        self.backoff_base = backoff_base or float(os.getenv("CRAWL_BACKOFF_BASE", "0.5"))
+        self.backoff_max = backoff_max or float(os.getenv("CRAWL_BACKOFF_MAX", "30"))
+        self.timeout = timeout or float(os.getenv("SCRAPER_TIMEOUT", "15"))
+        if respect_robots is None:
+            respect_robots = os.getenv("CRAWL_RESPECT_ROBOTS", "1").lower() not in ("0", "false", "off")
+        self.respect_robots = respect_robots
+
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def _host(self, url):
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        with self.lock:
+            state = self.hosts.get(host)
+            created = state is None
+            if created:
+                state = HostState(self.rate, self.burst, self.max_concurrency)
+                self.hosts[host] = state
+
+        if created:
+            try:
+                if self.respect_robots:
+                    state.set_crawl_delay(self._robots_crawl_delay(f"{parts.scheme}://{parts.netloc}/robots.txt"))
+            finally:
+                state.ready.set()
+        else:
+            state.ready.wait()
+        return state
+
+    def _robots_crawl_delay(self, robots_url):
+        try:
+            response = self.session.get(robots_url, timeout=5, verify=False)
+            if response.status_code != 200:
+                return None
+            robots = RobotFileParser()
+            robots.parse(response.text.splitlines())
+            robots.modified()
+            delay = robots.crawl_delay(self.session.headers.get('User-Agent', '*'))
+            return float(delay) if delay else None
+        except Exception as e:
+            print(f"Could not read {robots_url}: {e}")
+            return None
+
+    def _backoff(self, attempt, response=None):
+        """
+        Full jitter: a random delay up to base * 2^attempt, unless the server
+        asked for a specific wait with Retry-After.
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                try:
+                    return min(self.backoff_max, max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+                except Exception:
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url, **kwargs):
+        """
+        Drop-in for session.get(). Returns the last response (the caller still
+        decides what a 4xx/5xx means) or raises the last network error.
+        """
+        state = self._host(url)
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            state.acquire()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                state.count('errors')
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"{url}: {e.__class__.__name__}, retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    state.recover()
+                    return response
+                if attempt == self.max_retries:
+                    return response
+                delay = self._backoff(attempt, response)
+                if response.status_code in THROTTLE_STATUSES:
+                    state.throttle(delay)
+                # Hands the connection back to the pool; with stream=True it would
+                # stay checked out until the response is garbage collected
+                response.close()
+                print(f"{url}: HTTP {response.status_code}, retrying in {delay:.1f}s")
+            finally:
+                state.release()
+
+            state.count('retries')
+            time.sleep(delay)
+
+    def metrics(self):
+        with self.lock:
+            hosts = dict(self.hosts)
+        return {host: state.to_dict() for host, state in hosts.items()}
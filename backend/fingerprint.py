@@ -0,0 +1,15 @@
+import hashlib
+import json
+
+# Recipe fields that make up its content. The generated id and the source url
+# are left out so re-extracting the same page gives the same fingerprint.
+FINGERPRINT_FIELDS = ('name', 'ingredients', 'instructions', 'imageUrl')
+
+def recipe_fingerprint(recipe):
+    """
+    SHA-256 of a recipe's content in canonical JSON form. Used to skip database
+    writes when a re-crawled recipe has not changed.
+    """
+    content = {field: recipe.get(field) for field in FINGERPRINT_FIELDS}
+    data = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
@@ -0,0 +1,186 @@
+import os
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from psycopg2.extras import RealDictCursor, execute_values
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid')
+
+def normalize_url(url):
+    """
+    Canonical form used to deduplicate crawl URLs: lowercase scheme and host,
+    no default port, no fragment, no tracking parameters and sorted query.
+    The path is kept as is, since servers may treat it case-sensitively.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ]
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(sorted(query)), ''))
+
+class CrawlFrontier:
+    """
+    Postgres-backed crawl frontier: one row per (job, normalized URL) with its kind,
+    depth, status (pending/done/failed), attempts and last error. The URL as first
+    discovered is kept too and is what pending() and complete() hand back, so
+    crawled recipes get the same source_url as when they are extracted by hand.
+
+    A URL enters the frontier once per job, so a run never fetches the same page
+    twice, and whatever is still pending after a crash is picked up by a resume.
+    """
+    def __init__(self, db, max_attempts=None):
+        self.db = db
+        self.max_attempts = max_attempts or int(os.getenv("CRAWL_MAX_ATTEMPTS", "3"))
+
+    def create_job(self, job):
+        with self.db.cursor(query="frontier_create_job") as cur:
+            cur.execute(
+                "INSERT INTO crawl_jobs (id, root_url, max_depth, status) VALUES (%s, %s, %s, %s)",
+                (job.id, job.root_url, job.max_depth, job.status)
+            )
+            self._insert(cur, job.id, [("root", job.root_url, 0)])
+
+    def get_job(self, job_id):
+        try:
+            with self.db.cursor(cursor_factory=RealDictCursor, query="frontier_get_job") as cur:
+                cur.execute("SELECT id, root_url, max_depth, status FROM crawl_jobs WHERE id = %s", (job_id,))
+                return cur.fetchone()
+        except Exception as e:
+            print(f"Error loading crawl job: {e}")
+            return None
+
+    def list_jobs(self, limit=20):
+        sql = """
+            SELECT id, root_url, max_depth, status, created_at, updated_at
+            FROM crawl_jobs ORDER BY created_at DESC LIMIT %s
+        """
+        try:
+            with self.db.cursor(cursor_factory=RealDictCursor, query="frontier_list_jobs") as cur:
+                cur.execute(sql, (limit,))
+                return cur.fetchall()
+        except Exception as e:
+            print(f"Error listing crawl jobs: {e}")
+            return []
+
+    def set_job_status(self, job_id, status):
+        with self.db.cursor(query="frontier_set_job_status") as cur:
+            cur.execute(
+                "UPDATE crawl_jobs SET status = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                (status, job_id)
+            )
+
+    def pending(self, job_id):
+        """
+        URLs still to process, as (kind, url, depth) tuples.
+        """
+        with self.db.cursor(query="frontier_pending") as cur:
+            cur.execute(
+                """
+                SELECT kind, COALESCE(source_url, url), depth FROM crawl_frontier
+                WHERE job_id = %s AND status = 'pending' ORDER BY depth
+                """,
+                (job_id,)
+            )
+            return cur.fetchall()
+
+    def _insert(self, cur, job_id, entries):
+        """
+        Adds (kind, url, depth) entries, skipping URLs the job already knows.
+        Returns only the newly added ones.
+        """
+        unique = {}
+        for kind, url, depth in entries:
+            unique.setdefault(normalize_url(url), (kind, url, depth))
+        if not unique:
+            return []
+        rows = execute_values(
+            cur,
+            """
+            INSERT INTO crawl_frontier (job_id, url, source_url, kind, depth) VALUES %s
+            ON CONFLICT (job_id, url) DO NOTHING
+            RETURNING kind, source_url, depth
+            """,
+            [(job_id, url, source_url, kind, depth) for url, (kind, source_url, depth) in unique.items()],
+            page_size=len(unique),
+            fetch=True
+        )
+        return [tuple(row) for row in rows]
+
+    def complete(self, job_id, url, follow_ups):
+        """
+        Marks a scanned page as done and enqueues what it links to, in one
+        transaction. Returns the follow-ups that were not already in the frontier.
+        """
+        with self.db.cursor(query="frontier_complete") as cur:
+            self._mark(cur, job_id, [url], 'done')
+            return self._insert(cur, job_id, follow_ups)
+
+    def mark_done(self, job_id, urls):
+        if not urls:
+            return
+        with self.db.cursor(query="frontier_mark_done") as cur:
+            self._mark(cur, job_id, urls, 'done')
+
+    def _mark(self, cur, job_id, urls, status):
+        cur.execute(
+            """
+            UPDATE crawl_frontier SET status = %s, updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = %s AND url = ANY(%s)
+            """,
+            (status, job_id, [normalize_url(url) for url in urls])
+        )
+
+    def fail(self, job_id, url, error):
+        """
+        Records a failed attempt. Returns True if the URL should be retried,
+        False once it has used up its attempts and is marked as failed.
+        """
+        with self.db.cursor(query="frontier_fail") as cur:
+            cur.execute(
+                """
+                UPDATE crawl_frontier
+                SET attempts = attempts + 1,
+                    last_error = %s,
+                    status = CASE WHEN attempts + 1 >= %s THEN 'failed' ELSE 'pending' END,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = %s AND url = %s
+                RETURNING status
+                """,
+                (str(error), self.max_attempts, job_id, normalize_url(url))
+            )
+            row = cur.fetchone()
+        return row is not None and row[0] == 'pending'
+
+    def retry_failed(self, job_id):
+        with self.db.cursor(query="frontier_retry_failed") as cur:
+            cur.execute(
+                """
+                UPDATE crawl_frontier SET status = 'pending', attempts = 0, updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = %s AND status = 'failed'
+                """,
+                (job_id,)
+            )
+            return cur.rowcount
+
+    def stats(self, job_id):
+        """
+        Frontier counts per kind and status, e.g. {"recipe": {"done": 120, "pending": 30}}.
+        """
+        try:
+            with self.db.cursor(query="frontier_stats") as cur:
+                cur.execute(
+                    "SELECT kind, status, count(*) FROM crawl_frontier WHERE job_id = %s GROUP BY kind, status",
+                    (job_id,)
+                )
+                stats = {}
+                for kind, status, count in cur.fetchall():
+                    stats.setdefault(kind, {})[status] = count
+                return stats
+        except Exception as e:
+            print(f"Error reading crawl frontier: {e}")
+            return {}
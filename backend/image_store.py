@@ -0,0 +1,147 @@
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: without it only originals are served
+    Image = None
+
+DEFAULT_IMAGE_DIR = os.path.join(os.path.dirname(__file__), '.cache', 'images')
+
+# Resized WebP variants: name -> longest side in pixels
+VARIANTS = {"thumb": 320, "medium": 800}
+WEBP_QUALITY = 80
+HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+class ImageStore:
+    """
+    Content-addressed local copy of recipe images. Each image is downloaded once at
+    import, stored under the SHA-256 of its bytes and pre-resized to WebP variants,
+    so the frontend loads small local files instead of hot-linking the originals.
+
+    `fetch(url)` downloads an image and returns its bytes (RecipeScraper.fetch_image).
+    """
+    def __init__(self, directory, fetch):
+        self.directory = directory
+        self.fetch = fetch
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, fetch):
+        # IMAGE_CACHE_DIR=off disables the image pipeline
+        directory = os.getenv("IMAGE_CACHE_DIR", DEFAULT_IMAGE_DIR)
+        if directory.lower() == 'off':
+            return None
+        return cls(directory, fetch)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key[:2], f"{key}.{suffix}")
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _url_key(self, url):
+        return "url-" + hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def cache_remote(self, url):
+        """
+        Returns the content hash of the image at `url`, downloading and storing it
+        the first time it is seen. Returns None if it cannot be fetched.
+        """
+        if not url:
+            return None
+        url_path = self._path(self._url_key(url), 'ref')
+        try:
+            with open(url_path, 'r', encoding='ascii') as f:
+                image_hash = f.read().strip()
+            if os.path.exists(self._path(image_hash, 'orig')):
+                return image_hash
+        except OSError:
+            pass
+
+        try:
+            image_hash = self.put(self.fetch(url), source_url=url)
+        except Exception as e:
+            print(f"Error caching image {url}: {e}")
+            return None
+        self._write(url_path, image_hash.encode('ascii'))
+        return image_hash
+
+    def attach(self, recipe):
+        """
+        Caches the recipe's imageUrl and sets recipe['imageHash'].
+        """
+        image_hash = self.cache_remote(recipe.get('imageUrl'))
+        if image_hash:
+            recipe['imageHash'] = image_hash
+        return recipe
+
+    def put(self, data, source_url=None):
+        image_hash = hashlib.sha256(data).hexdigest()
+        if os.path.exists(self._path(image_hash, 'orig')):
+            return image_hash
+
+        meta = {"source_url": source_url, "content_type": "application/octet-stream"}
+        if Image is not None:
+            with Image.open(io.BytesIO(data)) as image:
+                meta["content_type"] = Image.MIME.get(image.format, meta["content_type"])
+                meta["width"], meta["height"] = image.size
+                for variant in VARIANTS:
+                    self._write_variant(image, image_hash, variant)
+
+        self._write(self._path(image_hash, 'orig'), data)
+        self._write(self._path(image_hash, 'json'), json.dumps(meta).encode('utf-8'))
+        return image_hash
+
+    def _write_variant(self, image, image_hash, variant):
+        size = VARIANTS[variant]
+        resized = image.copy()
+        resized.thumbnail((size, size))
+        if resized.mode not in ("RGB", "RGBA"):
+            resized = resized.convert("RGBA" if "transparency" in resized.info else "RGB")
+        buffer = io.BytesIO()
+        resized.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+        self._write(self._path(image_hash, f"{variant}.webp"), buffer.getvalue())
+
+    def get(self, image_hash, variant=None):
+        """
+        Returns (path, mimetype) for an image or one of its variants, or None.
+        Missing variants are generated on demand; without Pillow the original is served.
+        """
+        if not HASH_RE.match(image_hash or ''):
+            return None
+        original = self._path(image_hash, 'orig')
+        if not os.path.exists(original):
+            return None
+
+        if variant in VARIANTS and Image is not None:
+            path = self._path(image_hash, f"{variant}.webp")
+            if not os.path.exists(path):
+                try:
+                    with Image.open(original) as image:
+                        self._write_variant(image, image_hash, variant)
+                except Exception as e:
+                    print(f"Error resizing image {image_hash}: {e}")
+                    path = None
+            if path:
+                return path, "image/webp"
+
+        try:
+            with open(self._path(image_hash, 'json'), 'r', encoding='utf-8') as f:
+                content_type = json.load(f).get('content_type')
+        except (OSError, ValueError):
+            content_type = None
+        return original, content_type or "application/octet-stream"
@@ -0,0 +1,90 @@
+import re
+import unicodedata
+
+# Words that never name an ingredient on their own: quantities, units,
+# preparation notes and connectors (Catalan and Spanish), already accent-folded.
+NOISE_WORDS = {
+    # connectors
+    'a', 'al', 'amb', 'con', 'de', 'del', 'dels', 'd', 'el', 'els', 'en', 'i', 'la', 'las', 'les', 'l',
+    'lo', 'los', 'o', 'per', 'para', 'un', 'una', 'uns', 'unes', 'y', 'u', 'mig', 'medio', 'media',
+    # units
+    'g', 'gr', 'grs', 'grams', 'gramos', 'kg', 'kilo', 'kilos', 'ml', 'cl', 'dl', 'litre', 'litres', 'litro', 'litros',
+    'cullerada', 'cullerades', 'culleradeta', 'culleradetes', 'cucharada', 'cucharadas', 'cucharadita', 'cucharaditas',
+    'tassa', 'tasses', 'taza', 'tazas', 'got', 'gots', 'vaso', 'vasos', 'pessic', 'pessics', 'pizca', 'pizcas',
+    'manat', 'manats', 'manojo', 'gra', 'grans', 'diente', 'dientes', 'branca', 'branques', 'rama', 'ramas',
+    'fulla', 'fulles', 'hoja', 'hojas', 'llauna', 'llaunes', 'lata', 'latas', 'paquet', 'paquete', 'unitat', 'unitats',
+    'tros', 'trossos', 'trozo', 'trozos', 'rodanxa', 'rodanxes', 'llesca', 'llesques', 'rebanada', 'rebanadas',
+    # descriptors
+    'gros', 'grossa', 'grossos', 'grosses', 'grande', 'grandes', 'petit', 'petita', 'petits', 'petites',
+    'pequeno', 'pequena', 'mitja', 'mitjana', 'mediano', 'mediana', 'fresc', 'fresca', 'frescos', 'fresques',
+    'fresco', 'madur', 'madura', 'madurs', 'madures', 'maduro', 'picat', 'picada', 'picats', 'picades', 'picado',
+    'tallat', 'tallada', 'tallats', 'tallades', 'cortado', 'ratllat', 'ratllada', 'rallado', 'rallada',
+    'verge', 'virgen', 'extra', 'bo', 'bona', 'bons', 'bones', 'opcional', 'gust', 'gusto', 'necessari', 'necesario',
+    'quantitat', 'cantidad', 'poc', 'poca', 'pocs', 'poques', 'poco', 'mica', 'aprox',
+    # query phrasing ("tinc ou i patata, que puc fer?")
+    'tinc', 'tengo', 'vull', 'quiero', 'fer', 'hacer', 'que', 'puc', 'puedo', 'cuinar', 'cocinar',
+    'recepta', 'receptes', 'receta', 'recetas', 'nevera', 'casa',
+}
+
+# Spanish stems mapped to the Catalan stem used by the catalogue,
+# so "huevo patata cebolla" finds recipes listing "ous, patates, ceba".
+SYNONYMS = {
+    'huev': 'ou', 'ceboll': 'ceb', 'ajo': 'all', 'aceit': 'oli', 'tomat': 'tomaquet',
+    'zanahori': 'pastanag', 'ques': 'formatg', 'lech': 'llet', 'harin': 'farin', 'azucar': 'sucr',
+    'poll': 'pollastr', 'arroz': 'arr', 'cerd': 'porc', 'mantequill': 'manteg', 'guisant': 'pesol',
+    'calabacin': 'carbass', 'berenjen': 'albergini', 'garbanz': 'cigron', 'lentej': 'llenti',
+    'judi': 'monget', 'set': 'bolet', 'perejil': 'julivert', 'limon': 'llimon',
+}
+
+_ACCENT_RE = re.compile('[\u0300-\u036f]')
+_WORD_RE = re.compile(r"[a-z]+")
+_NUMBER_RE = re.compile(r"\d+([.,/]\d+)?")
+
+def fold_accents(text):
+    """
+    Lowercases and strips diacritics: "Pèsols" -> "pesols", "Col·liflor" -> "colliflor".
+    """
+    text = unicodedata.normalize('NFD', text.lower()).replace('·', '')
+    return unicodedata.normalize('NFC', _ACCENT_RE.sub('', text))
+
+def stem(word):
+    """
+    Light Catalan/Spanish stemmer that conflates singular and plural forms:
+    "patata", "patates" and "patatas" all become "patat".
+    """
+    if len(word) > 4 and word.endswith('es'):
+        word = word[:-2]
+    elif len(word) > 2 and word.endswith('s'):
+        word = word[:-1]
+    if len(word) > 3 and word[-1] in 'aeo':
+        word = word[:-1]
+    return word
+
+def canonical_terms(line):
+    """
+    Extracts canonical ingredient terms from a free-text line.
+    "2 patates grosses" -> ["patat"], "Oli d'oliva verge" -> ["oli", "oliv"]
+    """
+    text = _NUMBER_RE.sub(' ', fold_accents(line))
+    terms = []
+    for word in _WORD_RE.findall(text):
+        if word in NOISE_WORDS or len(word) < 2:
+            continue
+        term = stem(word)
+        term = SYNONYMS.get(term, term)
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+def recipe_terms(ingredients):
+    """
+    Canonical terms for a whole ingredient list, deduplicated and in order.
+    """
+    terms = []
+    for line in ingredients or []:
+        if not isinstance(line, str):
+            continue
+        for term in canonical_terms(line):
+            if term not in terms:
+                terms.append(term)
+    return terms
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+class Job:
+    def __init__(self, kind, total=1):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = "queued"
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.result = None
+        self.results = []
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self):
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": {"total": self.total, "completed": self.completed, "failed": self.failed},
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+        if self.total > 1 or self.results:
+            data["results"] = self.results
+        else:
+            data["result"] = self.result
+        if self.error:
+            data["error"] = self.error
+        return data
+
+class JobQueue:
+    """
+    In-process worker pool for slow scraper calls. Endpoints enqueue work and
+    return a job id immediately; clients poll /api/jobs/<id> for the outcome.
+
+    Tasks follow the scraper convention of returning {"error": ...} on failure.
+    Jobs live in this process's memory, so poll the same worker that created them.
+    """
+    def __init__(self, max_workers=None, history=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or int(os.getenv("JOB_WORKERS", "8")))
+        self.history = history or int(os.getenv("JOB_HISTORY", "1000"))
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _register(self, job):
+        with self.lock:
+            self.jobs[job.id] = job
+            # Forget the oldest finished jobs once the history is full
+            while len(self.jobs) > self.history:
+                oldest_id, oldest = next(iter(self.jobs.items()))
+                if oldest.status in ("queued", "running"):
+                    break
+                del self.jobs[oldest_id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def submit(self, kind, func, *args):
+        """
+        Runs func(*args) in the background. The return value becomes job.result.
+        """
+        job = Job(kind)
+        self._register(job)
+
+        def run():
+            job.status = "running"
+            try:
+                result = func(*args)
+            except Exception as e:
+                result = {"error": str(e)}
+
+            job.result = result
+            if isinstance(result, dict) and "error" in result:
+                job.failed = 1
+                job.error = result["error"]
+                job.status = "failed"
+            else:
+                job.completed = 1
+                job.status = "done"
+            job.finished_at = time.time()
+
+        self.executor.submit(run)
+        return job
+
+    def submit_batch(self, kind, func, items):
+        """
+        Runs func(item) for every item concurrently under a single job.
+        job.results keeps the input order; each entry is {"input", "result"}.
+        """
+        job = Job(kind, total=len(items))
+        job.results = [{"input": item, "result": None} for item in items]
+        self._register(job)
+
+        if not items:
+            job.status = "done"
+            job.finished_at = time.time()
+            return job
+
+        def run(index, item):
+            job.status = "running"
+            try:
+                result = func(item)
+            except Exception as e:
+                result = {"error": str(e)}
+
+            job.results[index]["result"] = result
+            with self.lock:
+                if isinstance(result, dict) and "error" in result:
+                    job.failed += 1
+                else:
+                    job.completed += 1
+                if job.completed + job.failed == job.total:
+                    job.status = "failed" if job.completed == 0 else "done"
+                    job.finished_at = time.time()
+
+        for index, item in enumerate(items):
+            self.executor.submit(run, index, item)
+        return job
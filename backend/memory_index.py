@@ -0,0 +1,276 @@
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left, insort
+from ingredients import fold_accents, recipe_terms
+
+# ts_rank's default weights for the A (name) and B (ingredients) labels
+NAME_WEIGHT = 1.0
+INGREDIENT_WEIGHT = 0.4
+RESULT_LIMIT = 20
+
+# Words as the "simple" text search parser splits them: runs of letters and digits
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+RECORD_FIELDS = (
+    "id", "name", "ingredients", "instructions", "image_url", "image_hash", "source_url",
+    "created_at", "updated_at", "last_checked", "duplicate_of"
+)
+
+class RecipeRecord:
+    """
+    One recipe row plus what the index derived from it. __slots__ keeps each
+    record to a fixed set of attributes instead of a per-instance dict.
+    """
+    __slots__ = RECORD_FIELDS + ("ordinal", "name_tokens", "ingredient_tokens", "terms", "ingredient_count")
+
+    def __init__(self, row, ordinal, fold):
+        for field in RECORD_FIELDS:
+            setattr(self, field, row.get(field))
+        self.id = str(self.id)
+        self.ordinal = ordinal
+        ingredients = self.ingredients if isinstance(self.ingredients, list) else []
+        self.name_tokens = tuple(set(_tokens(self.name or '', fold)))
+        self.ingredient_tokens = tuple(set(
+            token for line in ingredients if isinstance(line, str) for token in _tokens(line, fold)
+        ))
+        self.terms = tuple(recipe_terms(ingredients))
+        self.ingredient_count = len(ingredients)
+
+    def to_dict(self, fields):
+        return {field: getattr(self, field) for field in fields}
+
+def _tokens(text, fold):
+    tokens = _TOKEN_RE.findall(text.lower())
+    return [fold_accents(token) for token in tokens] if fold else tokens
+
+def _add_posting(postings, key, ordinal):
+    # Ordinals only grow, so appending keeps every posting list sorted
+    values = postings.get(key)
+    if values is None:
+        values = postings[key] = array('I')
+    values.append(ordinal)
+
+def _remove_posting(postings, key, ordinal):
+    values = postings.get(key)
+    if values is None:
+        return
+    index = bisect_left(values, ordinal)
+    if index < len(values) and values[index] == ordinal:
+        values.pop(index)
+    if not values:
+        del postings[key]
+
+class MemoryIndex:
+    """
+    In-process read replica of the recipes table for search and listing.
+
+    Records live in a list indexed by ordinal; posting lists are arrays of
+    ordinals keyed by name token, ingredient token and canonical ingredient term.
+    A prefix query is a binary search over the sorted token vocabulary, the same
+    way the tsquery `lexeme:*` matches the search_vector. Ranking uses ts_rank's
+    default label weights, so results follow the SQL search closely but scores
+    are not identical.
+
+    The process's ChangeFeed (change_feed.py) keeps the index in sync through the
+    LISTEN/NOTIFY triggers created by Database.create_tables; see handle_changes.
+    """
+    def __init__(self, db, on_change=None):
+        self.db = db
+        self.on_change = on_change
+        self.fold = db.has_unaccent
+        self.lock = threading.RLock()
+        self.ready = False
+        self._reset()
+
+    def _reset(self):
+        self.records = []            # ordinal -> RecipeRecord, None once replaced or deleted
+        self.by_id = {}              # recipe id -> RecipeRecord
+        self.tokens = []             # sorted vocabulary of name and ingredient tokens
+        self.name_postings = {}      # token -> array of ordinals
+        self.ingredient_postings = {}
+        self.term_postings = {}      # canonical ingredient term -> array of ordinals
+        self._order = None           # ordinals by created_at DESC, id DESC, rebuilt lazily
+
+    def __len__(self):
+        return len(self.by_id)
+
+    # Maintenance
+
+    def load(self, rows):
+        # Built without the lock and swapped in, so queries keep being answered
+        # from the current data while the whole table streams in
+        fresh = MemoryIndex.__new__(MemoryIndex)
+        fresh.fold = self.fold
+        fresh._reset()
+        for row in rows:
+            fresh._add(row, sort=False)
+        fresh.tokens.sort()
+        with self.lock:
+            self.records, self.by_id, self.tokens = fresh.records, fresh.by_id, fresh.tokens
+            self.name_postings = fresh.name_postings
+            self.ingredient_postings = fresh.ingredient_postings
+            self.term_postings = fresh.term_postings
+            self._order = None
+            self.ready = True
+        print(f"Loaded {len(self.by_id)} recipes into the memory index")
+
+    def upsert(self, row):
+        with self.lock:
+            self._remove(str(row['id']))
+            self._add(row, sort=True)
+
+    def remove(self, recipe_id):
+        with self.lock:
+            self._remove(str(recipe_id))
+
+    def _add(self, row, sort):
+        record = RecipeRecord(row, len(self.records), self.fold)
+        self.records.append(record)
+        self.by_id[record.id] = record
+        for token in record.name_tokens:
+            self._add_token(token, sort)
+            _add_posting(self.name_postings, token, record.ordinal)
+        for token in record.ingredient_tokens:
+            self._add_token(token, sort)
+            _add_posting(self.ingredient_postings, token, record.ordinal)
+        for term in record.terms:
+            _add_posting(self.term_postings, term, record.ordinal)
+        self._order = None
+
+    def _add_token(self, token, sort):
+        if token in self.name_postings or token in self.ingredient_postings:
+            return
+        if sort:
+            insort(self.tokens, token)
+        else:
+            self.tokens.append(token)
+
+    def _remove(self, recipe_id):
+        record = self.by_id.pop(recipe_id, None)
+        if record is None:
+            return
+        self.records[record.ordinal] = None
+        for token in record.name_tokens:
+            _remove_posting(self.name_postings, token, record.ordinal)
+        for token in record.ingredient_tokens:
+            _remove_posting(self.ingredient_postings, token, record.ordinal)
+        for token in set(record.name_tokens + record.ingredient_tokens):
+            if token not in self.name_postings and token not in self.ingredient_postings:
+                index = bisect_left(self.tokens, token)
+                if index < len(self.tokens) and self.tokens[index] == token:
+                    del self.tokens[index]
+        for term in record.terms:
+            _remove_posting(self.term_postings, term, record.ordinal)
+        self._order = None
+
+    # Queries
+
+    def _prefix_matches(self, postings, lexeme):
+        matches = set()
+        index = bisect_left(self.tokens, lexeme)
+        while index < len(self.tokens) and self.tokens[index].startswith(lexeme):
+            matches.update(postings.get(self.tokens[index], ()))
+            index += 1
+        return matches
+
+    def search_text(self, lexemes, fields=RECORD_FIELDS, limit=RESULT_LIMIT):
+        """
+        Recipes matching any lexeme as a prefix of a name or ingredient word,
+        best first, like Database.search_recipes_in_db.
+        """
+        with self.lock:
+            scores = {}
+            for lexeme in lexemes:
+                for ordinal in self._prefix_matches(self.name_postings, lexeme):
+                    scores[ordinal] = scores.get(ordinal, 0) + NAME_WEIGHT
+                for ordinal in self._prefix_matches(self.ingredient_postings, lexeme):
+                    scores[ordinal] = scores.get(ordinal, 0) + INGREDIENT_WEIGHT
+            # Near-duplicates stay listed but are left out of search, as in SQL
+            for ordinal in [o for o in scores if self.records[o].duplicate_of]:
+                del scores[ordinal]
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], self.records[item[0]].created_at))
+            results = []
+            for ordinal, score in best:
+                row = self.records[ordinal].to_dict(fields)
+                row['relevance'] = score
+                results.append(row)
+            return results
+
+    def search_ingredients(self, terms, fields=RECORD_FIELDS, limit=RESULT_LIMIT):
+        """
+        Recipes using the most of `terms`, then the fewest other ingredients,
+        like Database.search_recipes_by_ingredients.
+        """
+        with self.lock:
+            matched = {}
+            for term in terms:
+                for ordinal in self.term_postings.get(term, ()):
+                    matched[ordinal] = matched.get(ordinal, 0) + 1
+            for ordinal in [o for o in matched if self.records[o].duplicate_of]:
+                del matched[ordinal]
+
+            def rank(item):
+                record = self.records[item[0]]
+                return (-item[1], record.ingredient_count, -record.created_at.timestamp())
+
+            results = []
+            for ordinal, count in heapq.nsmallest(limit, matched.items(), key=rank):
+                row = self.records[ordinal].to_dict(fields)
+                row['matched_ingredients'] = count
+                row['coverage'] = count / len(terms)
+                results.append(row)
+            return results
+
+    def all_recipes(self, fields=RECORD_FIELDS):
+        """
+        Every recipe, newest first, like Database.get_all_recipes.
+        """
+        with self.lock:
+            if self._order is None:
+                live = [record for record in self.records if record is not None]
+                live.sort(key=lambda record: (record.created_at, record.id), reverse=True)
+                self._order = [record.ordinal for record in live]
+            return [self.records[ordinal].to_dict(fields) for ordinal in self._order]
+
+    # Sync
+
+    def refresh(self, recipe_ids):
+        """
+        Re-reads the given recipes from Postgres and applies them; ids that no
+        longer exist are removed.
+        """
+        recipe_ids = list(dict.fromkeys(str(recipe_id) for recipe_id in recipe_ids))
+        if not recipe_ids:
+            return
+        rows = self.db.fetch_recipes(recipe_ids)
+        found = set()
+        for row in rows:
+            found.add(str(row['id']))
+            self.upsert(row)
+        removed = [recipe_id for recipe_id in recipe_ids if recipe_id not in found]
+        for recipe_id in removed:
+            self.remove(recipe_id)
+        if self.on_change:
+            self.on_change(rows, removed)
+
+    def reload(self):
+        self.load(self.db.iter_recipes())
+        if self.on_change:
+            self.on_change(None, None)
+
+    def handle_changes(self, recipe_ids):
+        """
+        ChangeFeed subscriber. None (a reconnect or TRUNCATE) reloads everything.
+        """
+        # Replaced records leave tombstones; rebuild once they outnumber live ones
+        if recipe_ids is None or len(self.records) > 2 * len(self.by_id) + 1000:
+            self.reload()
+        else:
+            self.refresh(recipe_ids)
+
+    def disconnected(self):
+        # Notifications may be lost while disconnected: serve from Postgres until reloaded
+        self.ready = False
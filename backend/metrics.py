@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a cached search to a slow page download
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _threshold(name):
+    # Slow-call thresholds in milliseconds; unset or 0 disables the log
+    value = float(os.getenv(name, "0") or 0)
+    return value / 1000 if value > 0 else None
+
+SLOW_REQUEST_SECONDS = _threshold("SLOW_REQUEST_MS")
+SLOW_QUERY_SECONDS = _threshold("SLOW_QUERY_MS")
+SLOW_FETCH_SECONDS = _threshold("SLOW_FETCH_MS")
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def drain(self):
+        """
+        Returns the values recorded so far and starts over. Parse worker processes
+        ship their numbers to the parent this way (see merge).
+        """
+        with self.lock:
+            values, self.values = self.values, {}
+        return values
+
+    def merge(self, values):
+        with self.lock:
+            for key, value in values.items():
+                self.values[key] = self.values.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus exposition format.
+    Each label combination keeps per-bucket counts, a sum and a count.
+    """
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def drain(self):
+        """
+        Returns the series recorded so far and starts over (see Counter.drain).
+        """
+        with self.lock:
+            series, self.series = self.series, {}
+        return series
+
+    def merge(self, series):
+        # Adds series drained from a histogram with the same buckets
+        with self.lock:
+            for key, (counts, total, count) in series.items():
+                mine = self.series.get(key)
+                if mine is None:
+                    mine = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+                mine[0] = [a + b for a, b in zip(mine[0], counts)]
+                mine[1] += total
+                mine[2] += count
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, [("le", repr(float(bound)))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key, [("le", "+Inf")])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    """
+    Process-local metric registry. With several gunicorn workers every worker
+    exposes its own numbers; Prometheus sums them across scrape targets.
+    """
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "chefbot_http_request_duration_seconds", "Time spent handling API requests.",
+    ("method", "route", "status")
+)
+SCRAPER_PHASE_SECONDS = REGISTRY.histogram(
+    "chefbot_scraper_phase_duration_seconds",
+    "Time spent in each scraper phase (fetch, parse, soup and extraction strategies).",
+    ("kind", "phase")
+)
+SCRAPER_STRATEGY_TOTAL = REGISTRY.counter(
+    "chefbot_scraper_strategy_total", "Recipe extraction attempts by strategy and outcome.",
+    ("strategy", "result")
+)
+SCRAPER_PAGES_TOTAL = REGISTRY.counter(
+    "chefbot_scraper_pages_total", "Pages fetched, by whether the cached parse was reused.",
+    ("kind", "cache")
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "chefbot_db_query_duration_seconds", "Time spent executing SQL, by Database operation.",
+    ("query",)
+)
+DB_QUERY_ERRORS = REGISTRY.counter(
+    "chefbot_db_query_errors_total", "SQL statements that raised, by Database operation.",
+    ("query",)
+)
+SEARCH_CACHE_TOTAL = REGISTRY.counter(
+    "chefbot_search_cache_requests_total", "Search cache lookups by result.",
+    ("result",)
+)
+
+@contextmanager
+def timed(histogram, slow_threshold=None, describe=None, **labels):
+    """
+    Observes the duration of the block in `histogram`. If it takes longer than
+    `slow_threshold` seconds, logs it with `describe()` as context.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, **labels)
+        if slow_threshold is not None and elapsed >= slow_threshold:
+            detail = f" {describe()}" if describe else ""
+            label_text = " ".join(f"{key}={value}" for key, value in labels.items())
+            print(f"SLOW {histogram.name} {label_text} {elapsed * 1000:.1f}ms{detail}")
@@ -0,0 +1,41 @@
+"""
+Creates or upgrades the database schema, once per deploy, before the API
+workers start:
+
+    python migrate.py            # migrate if the schema is behind
+    python migrate.py --check    # exit 1 if a migration is pending
+
+Workers only read the schema version when they connect. With
+DB_AUTO_MIGRATE=on (the default) the first worker to find an old schema
+migrates it under an advisory lock; run this step and set DB_AUTO_MIGRATE=off
+to keep DDL and backfills out of worker boot entirely.
+"""
+import argparse
+import sys
+from database import Database, SCHEMA_VERSION
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create or upgrade the recipes database schema.")
+    parser.add_argument("--check", action="store_true", help="Only report whether a migration is pending")
+    args = parser.parse_args(argv)
+
+    db = Database()
+    # Migrate explicitly below rather than as a side effect of connecting
+    db.auto_migrate = False
+    try:
+        if not db.open():
+            print("Could not connect to the database", file=sys.stderr)
+            return 2
+        version = db.schema_version()
+        if version is not None and version >= SCHEMA_VERSION:
+            print(f"Schema is up to date (version {version})", file=sys.stderr)
+            return 0
+        if args.check:
+            print(f"Schema is at version {version}, expected {SCHEMA_VERSION}", file=sys.stderr)
+            return 1
+        return 0 if db.migrate() else 1
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Writes between two prune passes over the cache directory
+PRUNE_EVERY = 200
+
+class PageCache:
+    """
+    On-disk HTTP cache keyed by URL. Stores the body together with its ETag/Last-Modified
+    validators so re-crawls can revalidate with a conditional GET, plus the results
+    already extracted from that body so a 304 also skips the parse.
+
+    Results are tagged with `results_version` (the parser and extraction code that
+    produced them); results from another version are ignored and replaced, so a
+    parser or extractor change takes effect on unchanged pages too.
+
+    The cache is capped by `max_bytes` and `max_age` (seconds since a page was
+    last stored or revalidated); see prune. None disables a cap.
+    """
+    def __init__(self, directory, results_version=None, max_bytes=None, max_age=None):
+        self.directory = directory
+        self.results_version = results_version
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._writes = 0
+        self._prune_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, url, suffix):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.{suffix}")
+
+    def _write(self, path, data):
+        # Write to a temp file and rename so concurrent readers never see partial files
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, url):
+        """
+        Returns the cached metadata for a URL ({"etag", "last_modified", "results", ...}) or None.
+        """
+        try:
+            with open(self._path(url, 'json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get_body(self, url):
+        try:
+            with open(self._path(url, 'html'), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def conditional_headers(self, url):
+        entry = self.get(url)
+        if not entry:
+            return {}
+        # Marks the page as used, for prune()
+        try:
+            os.utime(self._path(url, 'json'))
+        except OSError:
+            pass
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, response):
+        """
+        Stores a 200 response if the server sent validators; otherwise there is
+        nothing to revalidate against and caching would only waste disk.
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return False
+
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+            "results_version": self.results_version,
+            "results": {}
+        }
+        self._write(self._path(url, 'html'), response.content)
+        self._write(self._path(url, 'json'), json.dumps(entry).encode('utf-8'))
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 1:
+            self._maybe_prune()
+        return True
+
+    def get_result(self, url, kind):
+        entry = self.get(url)
+        if not entry or entry.get('results_version') != self.results_version:
+            return None
+        return entry.get('results', {}).get(kind)
+
+    def put_result(self, url, kind, result):
+        entry = self.get(url)
+        if not entry:
+            return
+        if entry.get('results_version') != self.results_version:
+            entry['results_version'] = self.results_version
+            entry['results'] = {}
+        entry.setdefault('results', {})[kind] = result
+        self._write(self._path(url, 'json'), json.dumps(entry).encode('utf-8'))
+
+    def _maybe_prune(self):
+        if (self.max_bytes is None and self.max_age is None) or not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            removed = self.prune()
+            if removed:
+                print(f"Pruned {removed} pages from the page cache")
+        except Exception as e:
+            print(f"Error pruning the page cache: {e}")
+        finally:
+            self._prune_lock.release()
+
+    def _entries(self):
+        """
+        [last used, bytes, paths] for every cached URL.
+        """
+        entries = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                key, _, suffix = name.partition('.')
+                if suffix not in ('html', 'json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entry = entries.setdefault(key, [0, 0, []])
+                entry[0] = max(entry[0], stat.st_mtime)
+                entry[1] += stat.st_size
+                entry[2].append(path)
+        return list(entries.values())
+
+    def prune(self):
+        """
+        Deletes the pages not used for max_age seconds, then the least recently
+        used ones until the cache fits in max_bytes. Returns how many were deleted.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[0])
+        cutoff = time.time() - self.max_age if self.max_age else None
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for used, size, paths in entries:
+            expired = cutoff is not None and used < cutoff
+            if not expired and (not self.max_bytes or total <= self.max_bytes):
+                # Oldest first: the remaining entries are newer and the cache fits
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
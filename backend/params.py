@@ -0,0 +1,64 @@
+"""
+Request parameter parsing shared by the Flask (app.py) and ASGI (asgi_app.py)
+APIs, so both accept and reject the same input. Invalid values raise
+ValueError with a message meant for the client; the routes answer 400.
+"""
+
+from datetime import datetime, timezone
+
+# Category levels a whole-site crawl may descend below the root menu
+MAX_CRAWL_DEPTH = 10
+# Largest batch_size POST /api/recipes/bulk accepts (rows per INSERT and commit)
+MAX_BULK_BATCH_SIZE = 5000
+# Most URLs one POST /api/extract/batch or /api/scan/batch may list
+MAX_BATCH_URLS = 100
+
+def int_param(data, name, default, minimum, maximum):
+    """
+    Reads an integer field from a JSON body, or `default` when it is absent.
+    Raises ValueError unless it is an integer in [minimum, maximum].
+    """
+    value = data.get(name, default)
+    if isinstance(value, bool):
+        raise ValueError(f"{name} must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    if not minimum <= value <= maximum:
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+def bulk_batch_size(data):
+    """
+    The optional batch_size of a bulk save request, or None for the default.
+    """
+    if not isinstance(data, dict) or data.get('batch_size') is None:
+        return None
+    return int_param(data, 'batch_size', None, 1, MAX_BULK_BATCH_SIZE)
+
+def batch_urls(data):
+    """
+    The `urls` list of a batch extract or scan request.
+    """
+    urls = data.get('urls') if isinstance(data, dict) else None
+    if not isinstance(urls, list) or not urls:
+        raise ValueError("A list of URLs is required")
+    if len(urls) > MAX_BATCH_URLS:
+        raise ValueError(f"At most {MAX_BATCH_URLS} URLs per batch")
+    if any(not isinstance(url, str) or not url for url in urls):
+        raise ValueError("URLs must be non-empty strings")
+    return urls
+
+def since_param(text):
+    """
+    Parses ?changed_since=<ISO timestamp> into an aware UTC datetime to compare
+    with the updated_at TIMESTAMPTZ column. A timestamp without offset is UTC.
+    """
+    try:
+        since = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError("changed_since must be an ISO 8601 timestamp")
+    if since.tzinfo is None:
+        return since.replace(tzinfo=timezone.utc)
+    return since.astimezone(timezone.utc)
@@ -0,0 +1,97 @@
+import re
+from functools import lru_cache
+from ingredients import SYNONYMS, canonical_terms, fold_accents, stem
+
+# Function words and request phrasing (Catalan and Spanish), accent-folded.
+STOP_WORDS = frozenset({
+    'a', 'al', 'als', 'amb', 'con', 'de', 'del', 'dels', 'd', 'el', 'els', 'en', 'es', 'i', 'la', 'las', 'les',
+    'l', 'lo', 'los', 'o', 'per', 'para', 'un', 'una', 'uns', 'unes', 'y', 'u', 'que', 'quin', 'quina', 'cual',
+    'me', 'em', 'm', 'mi', 'meu', 'se', 'si', 'no', 'com', 'como', 'fa', 'fer', 'hacer', 'hace', 'hi', 'ho',
+    'vull', 'quiero', 'voldria', 'querria', 'tinc', 'tengo', 'puc', 'puedo', 'cuinar', 'cocinar', 'preparar',
+    'recepta', 'receptes', 'receta', 'recetas', 'plat', 'plato', 'algo', 'alguna', 'algun', 'res',
+    'dona', 'dame', 'busca', 'buscar', 'cerca', 'cercar', 'mostra', 'muestra', 'ensenya', 'ensena',
+})
+
+# Phrases that announce a pantry-style question ("what can I cook with ...")
+_INGREDIENT_CUES = re.compile(
+    r"\b(tinc|tengo|amb el que|con lo que|que puc fer|que puedo hacer|nevera|ingredients?|ingredientes?|"
+    r"em queda|me queda|sobres|sobras)\b"
+)
+# Connectors typical of dish names ("pollastre al forn", "truita de patates", "a la planxa")
+_TITLE_CONNECTORS = frozenset({'al', 'a', 'de', 'del', 'amb', 'con', 'en', 'estil', 'estilo'})
+_TITLE_CUES = re.compile(r"\b(recepta de|receta de|com es fa|como se hace|como hacer|com fer)\b")
+_LIST_SEPARATORS = re.compile(r"[,;+/]|\s(?:i|y|e)\s")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_UNICODE_WORD_RE = re.compile(r"\w+")
+_SPACE_RE = re.compile(r"\s+")
+
+class ParsedQuery:
+    """
+    Result of analyze_query(): the normalized query, its search terms and
+    whether the user is looking for a dish by name or for what to cook with
+    a set of ingredients. Consumed by the SQL layer and the search cache.
+    """
+    __slots__ = ('raw', 'normalized', 'tokens', 'terms', 'ingredient_terms', 'intent')
+
+    def __init__(self, raw, normalized, tokens, terms, ingredient_terms, intent):
+        self.raw = raw
+        self.normalized = normalized
+        self.tokens = tokens
+        self.terms = terms
+        self.ingredient_terms = ingredient_terms
+        self.intent = intent
+
+    def __repr__(self):
+        return f"ParsedQuery(intent={self.intent!r}, terms={self.terms!r}, ingredient_terms={self.ingredient_terms!r})"
+
+def _classify(folded, words, content_words):
+    """
+    Title vs ingredient intent. Dish names read as phrases with connectors
+    ("pollastre al forn"); pantry queries read as lists ("ou, patata, ceba")
+    or state what the user has ("tinc ...").
+    """
+    if _TITLE_CUES.search(folded):
+        return 'title'
+    if _INGREDIENT_CUES.search(folded):
+        return 'ingredients'
+
+    separators = len(_LIST_SEPARATORS.findall(f" {folded} "))
+    if separators and separators >= len(content_words) - 1:
+        return 'ingredients'
+
+    has_connector = any(w in _TITLE_CONNECTORS for w in words)
+    if not has_connector and len(content_words) >= 3:
+        return 'ingredients'
+    return 'title'
+
+@lru_cache(maxsize=4096)
+def analyze_query(query):
+    """
+    Normalizes and interprets a free-text search. Pure and cached, so it is cheap
+    enough to run on every keystroke; treat the returned object as read-only.
+    """
+    raw = query or ""
+    folded = _SPACE_RE.sub(' ', fold_accents(raw)).strip()
+    words = _WORD_RE.findall(folded)
+    content = [w for w in words if w not in STOP_WORDS and (len(w) > 1 or w.isdigit())]
+
+    # Lowercase tokens that keep their accents, for indexes built without unaccent
+    tokens = [t for t in _UNICODE_WORD_RE.findall(raw.lower()) if len(t) > 1 and fold_accents(t) not in STOP_WORDS]
+
+    terms = []
+    for word in content:
+        term = stem(word)
+        for candidate in (term, SYNONYMS.get(term)):
+            if candidate and candidate not in terms:
+                terms.append(candidate)
+
+    ingredient_terms = canonical_terms(" ".join(content))
+
+    return ParsedQuery(
+        raw=raw,
+        normalized=" ".join(content),
+        tokens=tokens,
+        terms=terms,
+        ingredient_terms=ingredient_terms,
+        intent=_classify(folded, words, content)
+    )
@@ -1,8 +1,53 @@
+import multiprocessing
+import os
+import threading
+import time
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 import json
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from urllib.parse import urljoin
+from page_cache import PageCache
+from fingerprint import recipe_fingerprint
+from fetch_scheduler import FetchScheduler
+from extractors import Kilometre0Extractor, default_registry
+from metrics import SCRAPER_PHASE_SECONDS, SCRAPER_PAGES_TOTAL, SCRAPER_STRATEGY_TOTAL, SLOW_FETCH_SECONDS, timed
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), '.cache', 'pages')
+
+# Restricted parses: only build the parts of the tree a strategy actually reads
+JSON_LD_ONLY = SoupStrainer('script', type='application/ld+json')
+ROOT_MENU_ONLY = SoupStrainer('ul', class_='nav menu nav-pills mod-list')
+
+# Version of the parse and extraction code. Bump it whenever a parser or an
+# extractor changes its output, so results cached for unchanged pages are redone.
+PARSE_VERSION = 1
+
+# Parse method for each page kind; parse workers look them up by name
+PARSERS = {
+    "root": "_parse_root_categories",
+    "category": "_parse_category",
+    "extract": "_parse_recipe"
+}
+
+# The RecipeScraper of a parse worker process, built once by _init_parse_worker
+_worker_scraper = None
+
+def _init_parse_worker():
+    global _worker_scraper
+    _worker_scraper = RecipeScraper()
+
+# Metrics recorded while parsing; workers send theirs back with every result
+WORKER_METRICS = (SCRAPER_PHASE_SECONDS, SCRAPER_STRATEGY_TOTAL)
+
+def _parse_in_worker(kind, url, content):
+    start = time.perf_counter()
+    result = getattr(_worker_scraper, PARSERS[kind])(url, content)
+    elapsed = time.perf_counter() - start
+    return result, elapsed, [metric.drain() for metric in WORKER_METRICS]
 
 class RecipeScraper:
     def __init__(self):
@@ -20,41 +65,202 @@ class RecipeScraper:
             'Cache-Control': 'no-cache'
         }
 
-    def scan_root_categories(self, url):
+        # One keep-alive session for every request; urllib3 keeps a connection pool per host
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=int(os.getenv("CRAWL_WORKERS", "8")))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Per-host politeness: concurrency cap, rate limit, robots.txt Crawl-delay and retries
+        self.scheduler = FetchScheduler(self.session)
+
+        # Parser backend: lxml is several times faster; html5lib is kept as the
+        # lenient fallback for pages lxml cannot handle.
+        self.parser = os.getenv("SCRAPER_PARSER", "lxml")
+        self.fallback_parser = "html5lib"
+
+        # Site-specific extractors, dispatched by host
+        self.extractors = default_registry()
+
+        # SCRAPER_CACHE_DIR=off disables the conditional-GET page cache
+        cache_dir = os.getenv("SCRAPER_CACHE_DIR", DEFAULT_CACHE_DIR)
+        results_version = f"{self.parser}/{PARSE_VERSION}"
+        # Least recently used pages are pruned past SCRAPER_CACHE_MAX_MB, and pages not
+        # revalidated for SCRAPER_CACHE_MAX_AGE_DAYS are dropped; 0 disables either cap
+        max_mb = float(os.getenv("SCRAPER_CACHE_MAX_MB", "1024"))
+        max_days = float(os.getenv("SCRAPER_CACHE_MAX_AGE_DAYS", "30"))
+        self.cache = PageCache(
+            cache_dir, results_version,
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb > 0 else None,
+            max_age=max_days * 86400 if max_days > 0 else None
+        ) if cache_dir.lower() != 'off' else None
+
+        # Parsing is CPU-bound and holds the GIL. With PARSE_WORKERS > 1, bulk
+        # extraction (extract_batch, site crawls) runs in a process pool started on
+        # first use; single pages are always parsed in the calling thread.
+        self.parse_workers = int(os.getenv("PARSE_WORKERS", "0"))
+        self._parse_pool = None
+        self._parse_pool_lock = threading.Lock()
+
+    def _fetch(self, url):
         """
-        Scans the root URL for Level 0 categories (Top level menu items).
+        GETs a page through the shared session. Cached pages are revalidated with
+        If-None-Match/If-Modified-Since and served from disk on 304.
+        Returns (content, not_modified).
         """
+        headers = self.cache.conditional_headers(url) if self.cache else {}
+        response = self.scheduler.get(url, headers=headers, verify=False, allow_redirects=True)
+
+        if response.status_code == 304 and self.cache:
+            content = self.cache.get_body(url)
+            if content is not None:
+                return content, True
+            # Cached body is gone; fall back to a full download
+            response = self.scheduler.get(url, verify=False, allow_redirects=True)
+
+        response.raise_for_status()
+        if self.cache:
+            self.cache.put(url, response)
+        return response.content, False
+
+    def fetch_image(self, url, max_bytes=10 * 1024 * 1024):
+        """
+        Downloads an image through the scheduler. Used by ImageStore at import time.
+        """
+        response = self.scheduler.get(url, verify=False, allow_redirects=True, stream=True)
         try:
-            response = requests.get(url, headers=self.headers, timeout=15, verify=False)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html5lib')
-            
-            categories = []
-            
-            # Target the main menu: ul.nav.menu.mod-list
-            nav_menu = soup.find('ul', class_='nav menu nav-pills mod-list')
-            if nav_menu:
-                # Direct children LIs only (Level 0)
-                # find_all(recursive=False) on the UL finds LIs
-                for li in nav_menu.find_all('li', recursive=False):
-                    a = li.find('a', recursive=False) # Get the direct link
-                    if a:
-                        href = a.get('href')
-                        text = a.get_text(strip=True)
-                        
-                        if href and not href.startswith('#') and text and text.lower() not in ['inici', 'contactar', 'qui som']:
-                            full_url = urljoin(url, href)
-                            categories.append({
-                                "title": text,
-                                "url": full_url,
-                                "type": "category" 
-                            })
-                            
-            return categories
+            content_type = response.headers.get('Content-Type', '')
+            if not content_type.startswith('image/'):
+                raise ValueError(f"Not an image: {content_type or 'unknown type'}")
+
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"Image larger than {max_bytes} bytes")
+            return b"".join(chunks)
+        finally:
+            response.close()
+
+    def _make_soup(self, content, parse_only=None, parser=None):
+        """
+        Builds a soup with the configured parser, falling back to html5lib if it fails.
+        `parse_only` restricts the tree to matching elements (ignored by html5lib).
+        """
+        parser = parser or self.parser
+        if parser == "html5lib":
+            return BeautifulSoup(content, "html5lib")
+        try:
+            return BeautifulSoup(content, parser, parse_only=parse_only)
+        except Exception as e:
+            print(f"Parser {parser} failed ({e}), falling back to {self.fallback_parser}")
+            return BeautifulSoup(content, self.fallback_parser)
+
+    def _get_parse_pool(self):
+        if self.parse_workers <= 1:
+            return None
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                # spawn, not fork: this process has threads and open database
+                # connections that must not be copied into the workers
+                self._parse_pool = ProcessPoolExecutor(
+                    max_workers=self.parse_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_parse_worker
+                )
+            return self._parse_pool
+
+    def _discard_parse_pool(self, pool):
+        # A worker died (crash, OOM kill): the pool is unusable, start a new one next time
+        with self._parse_pool_lock:
+            if self._parse_pool is pool:
+                self._parse_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._parse_pool_lock:
+            pool, self._parse_pool = self._parse_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def parse_page(self, kind, url, content):
+        """
+        Parses fetched page content as `kind` ("root", "category" or "extract")
+        in the calling thread.
+        """
+        return getattr(self, PARSERS[kind])(url, content)
+
+    def _fetch_page(self, url, kind):
+        """
+        Fetches `url` for a `kind` parse. Returns (content, None), or (None, result)
+        when the page has not changed since its cached result was stored.
+        """
+        with timed(SCRAPER_PHASE_SECONDS, SLOW_FETCH_SECONDS, lambda: url, kind=kind, phase="fetch"):
+            content, not_modified = self._fetch(url)
+        if not_modified:
+            result = self.cache.get_result(url, kind)
+            if result is not None:
+                SCRAPER_PAGES_TOTAL.inc(kind=kind, cache="reused")
+                return None, result
+        return content, None
+
+    def _fetch_and_parse(self, url, kind):
+        """
+        Fetches `url` and parses it as `kind`, reusing the previous result when
+        the page has not changed since it was cached.
+        """
+        content, result = self._fetch_page(url, kind)
+        if result is not None:
+            return result
+
+        SCRAPER_PAGES_TOTAL.inc(kind=kind, cache="parsed")
+        with timed(SCRAPER_PHASE_SECONDS, kind=kind, phase="parse"):
+            result = self.parse_page(kind, url, content)
+        self._store_result(url, kind, result)
+        return result
+
+    def _store_result(self, url, kind, result):
+        if self.cache and not (isinstance(result, dict) and "error" in result):
+            self.cache.put_result(url, kind, result)
 
+    def scan_root_categories(self, url):
+        """
+        Scans the root URL for Level 0 categories (Top level menu items).
+        """
+        try:
+            return self._fetch_and_parse(url, 'root')
         except Exception as e:
             return {"error": str(e)}
 
+    def _parse_root_categories(self, url, content):
+        soup = self._make_soup(content, parse_only=ROOT_MENU_ONLY)
+        
+        categories = []
+        
+        # Target the main menu: ul.nav.menu.mod-list
+        nav_menu = soup.find('ul', class_='nav menu nav-pills mod-list')
+        if nav_menu:
+            # Direct children LIs only (Level 0)
+            # find_all(recursive=False) on the UL finds LIs
+            for li in nav_menu.find_all('li', recursive=False):
+                a = li.find('a', recursive=False) # Get the direct link
+                if a:
+                    href = a.get('href')
+                    text = a.get_text(strip=True)
+                    
+                    if href and not href.startswith('#') and text and text.lower() not in ['inici', 'contactar', 'qui som']:
+                        full_url = urljoin(url, href)
+                        categories.append({
+                            "title": text,
+                            "url": full_url,
+                            "type": "category" 
+                        })
+                        
+        return categories
+
     def scan_category(self, url):
         """
         Scans a category page for:
@@ -62,237 +268,182 @@ class RecipeScraper:
         2. Recipes (Level 2 items) - returned as type: 'recipe'
         """
         try:
-            response = requests.get(url, headers=self.headers, timeout=15, verify=False)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html5lib')
-            
-            items = []
-
-            # 1. Look for Subcategories (Children of the current active menu item)
-            # Find the active LI in the menu
-            current_li = soup.find('li', class_='current active')
-            if current_li:
-                # content of this LI might contain a UL with class 'nav-child'
-                sub_ul = current_li.find('ul', class_='nav-child')
-                if sub_ul:
-                    for li in sub_ul.find_all('li', recursive=False):
-                        a = li.find('a')
-                        if a:
-                             items.append({
-                                "title": a.get_text(strip=True),
-                                "url": urljoin(url, a.get('href')),
-                                "type": "category"
-                            })
-
-            # 2. Look for Recipes
-            # Pattern 1: Joomla Category Blog (kilometre0.cat specific)
-            for h2 in soup.find_all('h2', itemprop="name"):
-                a = h2.find('a', itemprop="url")
-                if a and a.get('href'):
-                    full_url = urljoin(url, a.get('href'))
-                    if not any(i['url'] == full_url for i in items): # Avoid duplicates
-                        items.append({
+            return self._fetch_and_parse(url, 'category')
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _parse_category(self, url, content):
+        soup = self._make_soup(content)
+        
+        items = []
+
+        # 1. Look for Subcategories (Children of the current active menu item)
+        # Find the active LI in the menu
+        current_li = soup.find('li', class_='current active')
+        if current_li:
+            # content of this LI might contain a UL with class 'nav-child'
+            sub_ul = current_li.find('ul', class_='nav-child')
+            if sub_ul:
+                for li in sub_ul.find_all('li', recursive=False):
+                    a = li.find('a')
+                    if a:
+                         items.append({
                             "title": a.get_text(strip=True),
-                            "url": full_url,
-                            "type": "recipe"
+                            "url": urljoin(url, a.get('href')),
+                            "type": "category"
                         })
-            
-            # Pattern 2: Fallback
-            if not any(i['type'] == 'recipe' for i in items):
-                 main_content = soup.find('main') or soup.find(role='main') or soup.body
-                 if main_content:
-                    for a in main_content.find_all('a'):
-                        href = a.get('href')
-                        if href and len(href) > 5 and not href.startswith('#') and ('recepta' in href.lower() or 'carn' in href.lower() or 'peix' in href.lower()):
-                             # Very broad, be careful. Maybe only text length?
-                             # Let's trust Pattern 1 mostly for this specific site.
-                             pass
-
-            return items
 
+        # 2. Look for Recipes
+        # Pattern 1: Joomla Category Blog (kilometre0.cat specific)
+        for h2 in soup.find_all('h2', itemprop="name"):
+            a = h2.find('a', itemprop="url")
+            if a and a.get('href'):
+                full_url = urljoin(url, a.get('href'))
+                if not any(i['url'] == full_url for i in items): # Avoid duplicates
+                    items.append({
+                        "title": a.get_text(strip=True),
+                        "url": full_url,
+                        "type": "recipe"
+                    })
+        
+        # Pattern 2: Fallback
+        if not any(i['type'] == 'recipe' for i in items):
+             main_content = soup.find('main') or soup.find(role='main') or soup.body
+             if main_content:
+                for a in main_content.find_all('a'):
+                    href = a.get('href')
+                    if href and len(href) > 5 and not href.startswith('#') and ('recepta' in href.lower() or 'carn' in href.lower() or 'peix' in href.lower()):
+                         # Very broad, be careful. Maybe only text length?
+                         # Let's trust Pattern 1 mostly for this specific site.
+                         pass
+
+        return items
+
+    def extract(self, url):
+        try:
+            result = self._fetch_and_parse(url, 'extract')
         except Exception as e:
             return {"error": str(e)}
+        return self._with_fingerprint(result)
 
-    def extract(self, url):
+    def extract_pooled(self, url):
+        """
+        extract() for bulk work such as a site crawl: the page is fetched in this
+        thread and parsed through extract_batch, so with PARSE_WORKERS > 1 the
+        parse runs in the process pool while this thread waits.
+        """
         try:
-            # Bypass SSL verification for legacy/misconfigured sites
-            # Increased timeout and added allow_redirects
-            response = requests.get(url, headers=self.headers, timeout=15, verify=False, allow_redirects=True)
-            response.raise_for_status()
-            
-            # Use 'html.parser' as it can be more lenient than html5lib sometimes, or stick to html5lib
-            soup = BeautifulSoup(response.content, 'html5lib')
-            
-            # Strategy 0: Site specific (kilometre0.cat)
-            if 'kilometre0.cat' in url:
-                k0_data = self._extract_kilometre0(soup)
-                if k0_data:
-                    return k0_data
-
-            # Strategy 1: JSON-LD (Schema.org)
-            data = self._extract_json_ld(soup)
-            if data:
-                return data
-                
-            # Strategy 2: Fallback (Microdata/HTML headers) - To be implemented if needed
-            # For now, return error if no JSON-LD found
-            return {"error": "No structured data (JSON-LD) found."}
-            
+            content, result = self._fetch_page(url, 'extract')
+            if result is None:
+                _, result = next(self.extract_batch([(url, content)]))
+                return result
         except Exception as e:
             return {"error": str(e)}
+        return self._with_fingerprint(result)
 
-    def _extract_kilometre0(self, soup):
+    def _with_fingerprint(self, result):
+        # Lets the database skip the write when a re-crawl finds the same recipe
+        if isinstance(result, dict) and "error" not in result:
+            result['contentHash'] = recipe_fingerprint(result)
+        return result
+
+    def extract_batch(self, pages):
         """
-        Robust extraction for kilometre0.cat using a forward-scanning state machine approach.
-        Fixes fragmented headers (IN-GREDIENTS) and nested P tags.
+        Extracts recipes from already-fetched pages, an iterable of (url, content)
+        pairs, across the parse pool. Yields (url, recipe or {"error": ...}) as
+        each page finishes, so results come back in completion order. At most
+        four pages per worker are in flight, which bounds memory for long inputs.
         """
+        pool = self._get_parse_pool()
+        max_in_flight = 4 * self.parse_workers
+        pages = iter(pages)
+        pending = {}
+        while True:
+            while pool is not None and len(pending) < max_in_flight:
+                page = next(pages, None)
+                if page is None:
+                    break
+                url, content = page
+                pending[pool.submit(_parse_in_worker, 'extract', url, content)] = (url, content)
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, content = pending.pop(future)
+                try:
+                    result, elapsed, worker_metrics = future.result()
+                except BrokenProcessPool:
+                    # A worker died and took every page still in the pool with it:
+                    # parse those here, then the rest of the input below
+                    self._discard_parse_pool(pool)
+                    pool = None
+                    lost = [(url, content)] + [pending.pop(other) for other in list(pending)]
+                    for lost_url, lost_content in lost:
+                        yield lost_url, self._extract_page(lost_url, lost_content)
+                    break
+                except Exception as e:
+                    yield url, {"error": str(e)}
+                    continue
+                for metric, values in zip(WORKER_METRICS, worker_metrics):
+                    metric.merge(values)
+                SCRAPER_PAGES_TOTAL.inc(kind="extract", cache="parsed")
+                SCRAPER_PHASE_SECONDS.observe(elapsed, kind="extract", phase="parse")
+                self._store_result(url, 'extract', result)
+                yield url, self._with_fingerprint(result)
+
+        # Without a pool (PARSE_WORKERS <= 1, or a worker crashed) the rest is parsed here
+        for url, content in pages:
+            yield url, self._extract_page(url, content)
+
+    def _extract_page(self, url, content):
+        SCRAPER_PAGES_TOTAL.inc(kind="extract", cache="parsed")
         try:
-            recipe = {
-                "name": "Sense títol",
-                "ingredients": [],
-                "instructions": "",
-                "imageUrl": ""
-            }
-
-            # 1. Title
-            # Priority: itemprop="headline" > h2 inside page-header > h2 itemprop="name"
-            title_node = soup.find(attrs={"itemprop": "headline"}) 
-            if not title_node: 
-                 header_div = soup.find('div', class_='page-header')
-                 if header_div: title_node = header_div.find('h2')
-            if not title_node:
-                title_node = soup.find('h2', itemprop="name")
-            
-            if title_node:
-                recipe['name'] = title_node.get_text(strip=True)
-
-            # 2. Main Content Scanning
-            # Try to find the main container. Usually itemprop="articleBody" or class="item-page"
-            article_body = soup.find(attrs={"itemprop": "articleBody"})
-            if not article_body:
-                article_body = soup.find('div', class_='item-page')
-
-            if article_body:
-                sections = {"intro": [], "ingredients": [], "instructions": [], "guarnicio": [], "estris": [], "ampliacio": []}
-                current_section = "intro" 
-
-                # Iterate over ALL paragraphs and headers in order of appearance
-                # Using descendants is safer but messy. using find_all recursive=True?
-                # Let's iterate find_all(['p', 'h3', 'h4', 'div', 'ul', 'ol']) within article_body
-                # preserving order.
-                elements = article_body.find_all(['p', 'h3', 'h4', 'h5', 'ul', 'ol', 'div'], recursive=False)
-                
-                # If structure is flat P tags
-                if not elements or len(elements) < 3:
-                     elements = article_body.find_all(['p', 'h3', 'h4', 'h5', 'ul', 'ol', 'div']) # Recursive if flat structure failed
-
-                for element in elements:
-                    # Skip empty
-                    text = element.get_text(" ", strip=True)
-                    if not text: continue
-                    
-                    # Detect Header
-                    is_header = False
-                    header_key = ""
-
-                    # Check explicit H tags
-                    if element.name in ['h3', 'h4', 'h5']:
-                        s_text = text.lower()
-                        if "gredients" in s_text: header_key = "ingredients"; is_header = True
-                        elif "preparaci" in s_text or "elaboraci" in s_text: header_key = "instructions"; is_header = True
-                        elif "guarnici" in s_text: header_key = "guarnicio"; is_header = True
-                        elif "estris" in s_text: header_key = "estris"; is_header = True
-                        elif "ampliaci" in s_text: header_key = "ampliacio"; is_header = True
-                    else:
-                        # Check STRONGS inside P/DIV
-                        strong = element.find(['strong', 'b'])
-                        if strong:
-                            s_text = strong.get_text(strip=True).lower()
-                            if len(s_text) > 3: # Avoid noise
-                                if "gredients" in s_text: header_key = "ingredients"; is_header = True
-                                elif "preparaci" in s_text or "elaboraci" in s_text: header_key = "instructions"; is_header = True
-                                elif "guarnici" in s_text: header_key = "guarnicio"; is_header = True
-                                elif "estris" in s_text: header_key = "estris"; is_header = True
-                                elif "ampliaci" in s_text: header_key = "ampliacio"; is_header = True
-
-                    if is_header:
-                        current_section = header_key
-                    else:
-                        # It's content
-                        # Get text with newlines for <br>
-                        content_text = element.get_text(separator='\n', strip=True)
-                        if content_text:
-                            sections[current_section].append(content_text)
-
-                # 3. Process Sections
-                
-                # Ingredients
-                # Join all text blocks, then split by newlines
-                raw_ings = "\n".join(sections["ingredients"])
-                clean_ings = []
-                for line in raw_ings.split('\n'):
-                    line = line.strip()
-                    # Filter out header noise if it crept in
-                    if len(line) < 2: continue
-                    if "GREDIENTS" in line or "gredients" in line.lower(): continue
-                    clean_ings.append(line)
-                recipe['ingredients'] = clean_ings
-
-                # Instructions
-                instr_parts = sections["instructions"]
-                
-                # Append Extras
-                if sections["guarnicio"]:
-                    instr_parts.append("\n--- GUARNICIÓ ---\n" + "\n".join(sections["guarnicio"]))
-                if sections["estris"]:
-                    instr_parts.append("\n--- ESTRIS ---\n" + "\n".join(sections["estris"]))
-                if sections["ampliacio"]:
-                    instr_parts.append("\n--- AMPLIACIÓ ---\n" + "\n".join(sections["ampliacio"]))
-
-                recipe['instructions'] = "\n".join(instr_parts)
-
-            # 4. Image Extraction
-            # Priority 1: Meta Tag og:image (Usually most reliable for social sharing)
-            meta_img = soup.find("meta", property="og:image")
-            if meta_img and meta_img.get("content"):
-                recipe['imageUrl'] = urljoin("https://www.kilometre0.cat", meta_img.get("content"))
+            with timed(SCRAPER_PHASE_SECONDS, kind="extract", phase="parse"):
+                result = self._parse_recipe(url, content)
+        except Exception as e:
+            return {"error": str(e)}
+        self._store_result(url, 'extract', result)
+        return self._with_fingerprint(result)
+
+    def _parse_recipe(self, url, content, parser=None):
+        parser = parser or self.parser
+        extractor = self.extractors.for_url(url)
+        skip = extractor.skip if extractor else frozenset()
+
+        # Strategy 0: Site specific extractor, chosen by host
+        with timed(SCRAPER_PHASE_SECONDS, kind="extract", phase=f"soup_{parser}"):
+            if extractor:
+                soup = self._make_soup(content, parser=parser)
             else:
-                # Priority 2: Image inside articleBody (usually the main recipe photo)
-                images = []
-                if article_body:
-                    images = article_body.find_all('img')
-                
-                # Priority 3: Fallback to any images in main content area
-                if not images:
-                     main_area = soup.find('div', class_='item-page') or soup.find('main')
-                     if main_area:
-                         images = main_area.find_all('img')
-
-                best_img = None
-                for img in images:
-                    src = img.get('src', '')
-                    if not src: continue
-                    
-                    # Filter out logos, icons, print buttons, spacers
-                    lower_src = src.lower()
-                    if any(x in lower_src for x in ['logo', 'icon', 'print', 'email', 'spacer', 'pixel', 'facebook', 'twitter']):
-                        continue
-                    
-                    # Heuristic: Recipe images usually have 'images/' path
-                    if 'images/' in lower_src:
-                        best_img = src
-                        break 
-                
-                if best_img:
-                    # Construct full absolute URL. Base URL is site root.
-                    recipe['imageUrl'] = urljoin("https://www.kilometre0.cat", best_img)
+                # Other sites only need the JSON-LD <script> tags
+                soup = self._make_soup(content, parse_only=JSON_LD_ONLY, parser=parser)
 
-            return recipe
+        if extractor:
+            with timed(SCRAPER_PHASE_SECONDS, kind="extract", phase="site_extractor"):
+                data = extractor.extract(soup, url)
+            SCRAPER_STRATEGY_TOTAL.inc(strategy="site_extractor", result="hit" if data else "miss")
+            if data:
+                return data
 
-        except Exception as e:
-            # Fallback to JSON-LD if custom parsing fails
-            print(f"Custom extraction failed: {e}")
-            return None
+        # Strategy 1: JSON-LD (Schema.org)
+        if 'json_ld' not in skip:
+            with timed(SCRAPER_PHASE_SECONDS, kind="extract", phase="json_ld"):
+                data = self._extract_json_ld(soup)
+            SCRAPER_STRATEGY_TOTAL.inc(strategy="json_ld", result="hit" if data else "miss")
+            if data:
+                return data
+
+        # A stricter parser may have lost markup that html5lib would recover
+        if parser != self.fallback_parser and 'fallback_parser' not in skip:
+            return self._parse_recipe(url, content, parser=self.fallback_parser)
+            
+        # Strategy 2: Fallback (Microdata/HTML headers) - To be implemented if needed
+        # For now, return error if no JSON-LD found
+        return {"error": "No structured data (JSON-LD) found."}
+
+    def _extract_kilometre0(self, soup):
+        return self.extractors.for_url(Kilometre0Extractor.base_url).extract(soup)
 
     def _extract_json_ld(self, soup):
         scripts = soup.find_all('script', type='application/ld+json')
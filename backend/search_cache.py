@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+def _encode(value):
+    # JSON has no datetime or UUID type: tag them so _decode restores the originals
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, uuid.UUID):
+        return {"$uuid": str(value)}
+    raise TypeError(f"Cannot cache {type(value).__name__} values")
+
+def _decode(obj):
+    if len(obj) == 1:
+        if "$datetime" in obj:
+            return datetime.fromisoformat(obj["$datetime"])
+        if "$uuid" in obj:
+            return uuid.UUID(obj["$uuid"])
+    return obj
+
+class MemoryCacheBackend:
+    """
+    LRU + TTL cache local to this process. With several gunicorn workers each one
+    keeps its own copy; writes made by other workers reach it through the change
+    feed (Database._recipes_changed), which invalidates it too.
+    """
+    shared = False
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self._generation = 0
+
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, generation):
+        with self.lock:
+            # Computed before an invalidation: it may already be stale
+            if generation != self._generation:
+                return
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self):
+        with self.lock:
+            self._generation += 1
+            self.entries.clear()
+
+class RedisCacheBackend:
+    """
+    Shared cache in a local Redis. Invalidation bumps a generation counter that is
+    part of every key, so all workers stop seeing old entries at once and the
+    stale ones simply expire. Values are stored as JSON, never pickled, so whoever
+    can write to Redis cannot make a worker run code.
+    """
+    shared = True
+
+    def __init__(self, url, prefix="chefbot:search"):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def generation(self):
+        return int(self.client.get(f"{self.prefix}:generation") or 0)
+
+    def get(self, key):
+        data = self.client.get(f"{self.prefix}:{self.generation()}:{key}")
+        return json.loads(data, object_hook=_decode) if data is not None else None
+
+    def set(self, key, value, ttl, generation):
+        # Stored under the generation the query started in, so a result computed
+        # before an invalidation is never read back
+        self.client.set(f"{self.prefix}:{generation}:{key}", json.dumps(value, default=_encode), ex=int(ttl))
+
+    def invalidate(self):
+        self.client.incr(f"{self.prefix}:generation")
+
+class SearchCache:
+    """
+    Caches search results keyed on the normalized query (mode + sorted token set),
+    so "pollastre al forn" and "forn, pollastre" share an entry.
+    Cache failures never break a search; they just fall through to the database.
+    """
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+
+    @classmethod
+    def from_env(cls, change_feed=True):
+        """
+        The cache SEARCH_CACHE selects. Without a change feed nothing would tell
+        this process about other workers' writes, so the in-memory cache is then
+        only used when asked for explicitly.
+        """
+        kind = os.getenv("SEARCH_CACHE", "memory" if change_feed else "off").lower()
+        ttl = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+        if kind == "off":
+            return None
+        if kind == "redis":
+            try:
+                return cls(RedisCacheBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0")), ttl)
+            except Exception as e:
+                print(f"Redis search cache unavailable ({e}), using in-memory cache")
+        return cls(MemoryCacheBackend(int(os.getenv("SEARCH_CACHE_SIZE", "1024"))), ttl)
+
+    @property
+    def shared(self):
+        return self.backend.shared
+
+    @staticmethod
+    def key(mode, tokens):
+        return f"{mode}:{' '.join(sorted(set(tokens)))}"
+
+    def get(self, key):
+        """
+        Returns (cached value or None, generation). Pass the generation to set(),
+        which drops the value if the cache was invalidated in the meantime.
+        """
+        try:
+            generation = self.backend.generation()
+            return self.backend.get(key), generation
+        except Exception as e:
+            print(f"Search cache read failed: {e}")
+            return None, None
+
+    def set(self, key, value, generation):
+        if generation is None:
+            return
+        try:
+            self.backend.set(key, value, self.ttl, generation)
+        except Exception as e:
+            print(f"Search cache write failed: {e}")
+
+    def invalidate(self):
+        try:
+            self.backend.invalidate()
+        except Exception as e:
+            print(f"Search cache invalidation failed: {e}")
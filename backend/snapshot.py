@@ -0,0 +1,241 @@
+"""
+Binary snapshots of the recipes table, to seed or back up an environment without
+replaying the library through the HTTP API.
+
+    python snapshot.py export recipes.snap
+    python snapshot.py import recipes.snap
+
+Format (all integers big-endian):
+
+    header   b"CHEFSNAP", u16 version, u16 column count, then per column u16 length + UTF-8 name
+    block    u32 compressed length, u32 row count, u32 CRC32 of the compressed bytes, zlib payload
+    trailer  a block header with length 0 whose row count is the total number of rows
+
+A block payload is columnar: every value of the first column, then the second,
+and so on, each as u32 length + UTF-8 bytes (0xFFFFFFFF for NULL). Grouping a
+column's values together lets zlib find the repetition across rows. Both writer
+and reader hold one block at a time, so memory stays bounded by the block size.
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import zlib
+from datetime import datetime
+from database import Database, SNAPSHOT_FIELDS
+
+MAGIC = b"CHEFSNAP"
+VERSION = 1
+NULL = 0xFFFFFFFF
+DEFAULT_BLOCK_ROWS = 1000
+
+# Columns that hold JSON and timestamps; everything else is stored as text
+JSON_COLUMNS = frozenset({"ingredients"})
+TIMESTAMP_COLUMNS = frozenset({"created_at", "updated_at", "last_checked"})
+
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+_BLOCK = struct.Struct(">III")
+
+class SnapshotError(ValueError):
+    pass
+
+def _read_exact(stream, size):
+    # Request bodies and pipes may return short reads
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            raise SnapshotError("Truncated snapshot")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+def _encode_value(column, value):
+    if value is None:
+        return None
+    if column in JSON_COLUMNS:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if isinstance(value, datetime):
+        return value.isoformat().encode('utf-8')
+    return str(value).encode('utf-8')
+
+def _decode_value(column, data):
+    if data is None:
+        return None
+    text = data.decode('utf-8')
+    if column in JSON_COLUMNS:
+        return json.loads(text)
+    if column in TIMESTAMP_COLUMNS:
+        return datetime.fromisoformat(text)
+    return text
+
+class SnapshotWriter:
+    """
+    Writes rows (tuples in `columns` order) to a binary stream, one compressed
+    block every `block_rows` rows. write() returns the bytes emitted so far, so
+    the writer can also feed a streaming HTTP response.
+    """
+    def __init__(self, columns, block_rows=DEFAULT_BLOCK_ROWS):
+        self.columns = tuple(columns)
+        self.block_rows = block_rows
+        self.pending = []
+        self.total_rows = 0
+
+    def header(self):
+        parts = [MAGIC, _U16.pack(VERSION), _U16.pack(len(self.columns))]
+        for column in self.columns:
+            name = column.encode('utf-8')
+            parts.append(_U16.pack(len(name)))
+            parts.append(name)
+        return b"".join(parts)
+
+    def write(self, row):
+        self.pending.append(row)
+        if len(self.pending) >= self.block_rows:
+            return self.flush()
+        return b""
+
+    def flush(self):
+        if not self.pending:
+            return b""
+        parts = []
+        for index, column in enumerate(self.columns):
+            for row in self.pending:
+                value = _encode_value(column, row[index])
+                if value is None:
+                    parts.append(_U32.pack(NULL))
+                else:
+                    parts.append(_U32.pack(len(value)))
+                    parts.append(value)
+        payload = zlib.compress(b"".join(parts), 6)
+        block = _BLOCK.pack(len(payload), len(self.pending), zlib.crc32(payload)) + payload
+        self.total_rows += len(self.pending)
+        self.pending = []
+        return block
+
+    def close(self):
+        return self.flush() + _BLOCK.pack(0, self.total_rows, 0)
+
+class SnapshotReader:
+    """
+    Reads a snapshot from a binary stream. blocks() yields one list of row
+    dicts per block; the trailer's row count is checked at the end.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        if _read_exact(stream, len(MAGIC)) != MAGIC:
+            raise SnapshotError("Not a recipe snapshot")
+        version, = _U16.unpack(_read_exact(stream, 2))
+        if version != VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {version}")
+        count, = _U16.unpack(_read_exact(stream, 2))
+        columns = []
+        for _ in range(count):
+            length, = _U16.unpack(_read_exact(stream, 2))
+            try:
+                columns.append(_read_exact(stream, length).decode('utf-8'))
+            except UnicodeDecodeError as e:
+                raise SnapshotError(f"Malformed snapshot header: {e}") from e
+        self.columns = tuple(columns)
+
+    def blocks(self):
+        total_rows = 0
+        while True:
+            length, row_count, checksum = _BLOCK.unpack(_read_exact(self.stream, _BLOCK.size))
+            if length == 0:
+                if row_count != total_rows:
+                    raise SnapshotError(f"Snapshot has {total_rows} rows, trailer says {row_count}")
+                return
+            payload = _read_exact(self.stream, length)
+            if zlib.crc32(payload) != checksum:
+                raise SnapshotError("Corrupt snapshot block")
+            yield self._decode_block(payload, row_count)
+            total_rows += row_count
+
+    def _decode_block(self, payload, row_count):
+        # A payload can pass the CRC and still be malformed (it was written that
+        # way), so decoding errors are reported as a bad snapshot too
+        try:
+            data = zlib.decompress(payload)
+            rows = [{} for _ in range(row_count)]
+            view = memoryview(data)
+            offset = 0
+            for column in self.columns:
+                for row in rows:
+                    length, = _U32.unpack_from(view, offset)
+                    offset += 4
+                    if length == NULL:
+                        row[column] = None
+                    else:
+                        if offset + length > len(data):
+                            raise SnapshotError("Truncated snapshot block")
+                        row[column] = _decode_value(column, bytes(view[offset:offset + length]))
+                        offset += length
+        except SnapshotError:
+            raise
+        except (zlib.error, struct.error, ValueError) as e:
+            raise SnapshotError(f"Malformed snapshot block: {e}") from e
+        if offset != len(data):
+            raise SnapshotError(f"Snapshot block has {len(data) - offset} trailing bytes")
+        return rows
+
+def export_snapshot(db, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Yields the snapshot of every recipe as byte chunks, one per block.
+    """
+    writer = SnapshotWriter(SNAPSHOT_FIELDS, block_rows)
+    yield writer.header()
+    for row in db.iter_snapshot_rows(batch_size=block_rows):
+        chunk = writer.write(row)
+        if chunk:
+            yield chunk
+    yield writer.close()
+
+def import_snapshot(db, stream):
+    """
+    Restores a snapshot read from `stream`, one block per transaction.
+    Returns {"restored": rows written, "rows": rows in the snapshot}.
+    """
+    reader = SnapshotReader(stream)
+    missing = [column for column in ("name", "source_url") if column not in reader.columns]
+    if missing:
+        raise SnapshotError(f"Snapshot lacks columns: {', '.join(missing)}")
+    unknown = [column for column in reader.columns if column not in SNAPSHOT_FIELDS]
+    if unknown:
+        raise SnapshotError(f"Unknown snapshot columns: {', '.join(unknown)}")
+
+    restored = rows = 0
+    for block in reader.blocks():
+        rows += len(block)
+        restored += db.restore_recipes(block)
+    return {"restored": restored, "rows": rows}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import a binary snapshot of the recipes table.")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="Snapshot file, or - for stdout/stdin")
+    parser.add_argument("--block-rows", type=int, default=DEFAULT_BLOCK_ROWS)
+    args = parser.parse_args(argv)
+
+    db = Database()
+    try:
+        if args.command == "export":
+            out = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+            with out:
+                for chunk in export_snapshot(db, args.block_rows):
+                    out.write(chunk)
+            if args.path != "-":
+                print(f"Wrote {os.path.getsize(args.path)} bytes to {args.path}", file=sys.stderr)
+        else:
+            stream = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+            with stream:
+                result = import_snapshot(db, stream)
+            print(f"Restored {result['restored']} of {result['rows']} recipes", file=sys.stderr)
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import threading
+from bisect import bisect_left, insort
+from ingredients import NOISE_WORDS, SYNONYMS, fold_accents, stem
+from query_analysis import STOP_WORDS
+
+class SuggestIndex:
+    """
+    In-memory typeahead over recipe names and ingredient words, kept as one
+    sorted list of (key, kind, ref) tuples. A prefix lookup is a binary search
+    plus a short forward scan, so it stays well under a millisecond.
+
+    Names are indexed from every word ("forn" finds "Pollastre al forn").
+    Ingredient words are grouped by canonical term so "patata" and "patates"
+    suggest the same ingredient.
+    """
+    SCAN_LIMIT = 200
+
+    def __init__(self):
+        self.keys = []
+        self.lock = threading.RLock()
+        self.names = {}             # recipe_id -> display name
+        self.name_keys = {}         # recipe_id -> keys added for that recipe
+        self.recipe_terms = {}      # recipe_id -> ingredient terms
+        self.term_recipes = {}      # term -> set of recipe ids
+        self.term_surfaces = {}     # term -> {folded surface word: display word}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def load(self, recipes):
+        """
+        Bulk build from an iterable of {"id", "name", "ingredients"} rows.
+        """
+        with self.lock:
+            self.keys = []
+            self.names.clear()
+            self.name_keys.clear()
+            self.recipe_terms.clear()
+            self.term_recipes.clear()
+            self.term_surfaces.clear()
+            for recipe in recipes:
+                self._add(recipe, sort=False)
+            self.keys.sort()
+
+    def add(self, recipe):
+        with self.lock:
+            self.remove(recipe['id'])
+            self._add(recipe, sort=True)
+
+    def remove(self, recipe_id):
+        recipe_id = str(recipe_id)
+        with self.lock:
+            for key in self.name_keys.pop(recipe_id, []):
+                self._discard_key(key)
+            self.names.pop(recipe_id, None)
+
+            for term in self.recipe_terms.pop(recipe_id, []):
+                recipes = self.term_recipes.get(term)
+                if recipes is None:
+                    continue
+                recipes.discard(recipe_id)
+                if not recipes:
+                    # Last recipe using this ingredient: stop suggesting it
+                    del self.term_recipes[term]
+                    for surface in self.term_surfaces.pop(term, {}):
+                        self._discard_key((surface, 'ingredient', term))
+
+    def _insert_key(self, key, sort):
+        if sort:
+            insort(self.keys, key)
+        else:
+            self.keys.append(key)
+
+    def _discard_key(self, key):
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            del self.keys[index]
+
+    def _add(self, recipe, sort):
+        recipe_id = str(recipe['id'])
+        name = recipe.get('name') or ''
+        self.names[recipe_id] = name
+
+        words = fold_accents(name).split()
+        keys = []
+        for start in range(len(words)):
+            if start and words[start] in STOP_WORDS:
+                continue
+            key = (" ".join(words[start:]), 'recipe', recipe_id)
+            keys.append(key)
+            self._insert_key(key, sort)
+        self.name_keys[recipe_id] = keys
+
+        terms = set()
+        for line in recipe.get('ingredients') or []:
+            if not isinstance(line, str):
+                continue
+            for word in line.lower().replace("'", " ").split():
+                surface = fold_accents(word).strip('.,;:()')
+                if len(surface) < 3 or not surface.isalpha() or surface in NOISE_WORDS:
+                    continue
+                term = stem(surface)
+                term = SYNONYMS.get(term, term)
+                terms.add(term)
+
+                surfaces = self.term_surfaces.setdefault(term, {})
+                if surface not in surfaces:
+                    surfaces[surface] = word.strip('.,;:()')
+                    self._insert_key((surface, 'ingredient', term), sort)
+
+        self.recipe_terms[recipe_id] = terms
+        for term in terms:
+            self.term_recipes.setdefault(term, set()).add(recipe_id)
+
+    def suggest(self, prefix, limit=10):
+        """
+        Returns up to `limit` suggestions: recipes whose name starts with the
+        prefix come first, then other name matches, then ingredients by popularity.
+        """
+        prefix = " ".join(fold_accents(prefix).split())
+        if not prefix:
+            return []
+
+        recipes = {}
+        ingredients = {}
+        with self.lock:
+            index = bisect_left(self.keys, (prefix,))
+            end = min(len(self.keys), index + self.SCAN_LIMIT)
+            while index < end:
+                key, kind, ref = self.keys[index]
+                if not key.startswith(prefix):
+                    break
+                if kind == 'recipe':
+                    starts_name = fold_accents(self.names.get(ref, '')).startswith(prefix)
+                    if ref not in recipes or starts_name:
+                        recipes[ref] = starts_name
+                elif ref not in ingredients:
+                    ingredients[ref] = (self.term_surfaces[ref][key], len(self.term_recipes.get(ref, ())))
+                index += 1
+
+            results = [
+                {"text": self.names[recipe_id], "type": "recipe", "id": recipe_id}
+                for recipe_id, _ in sorted(recipes.items(), key=lambda item: (not item[1], self.names[item[0]]))
+            ]
+            results.extend(
+                {"text": display, "type": "ingredient", "count": count}
+                for display, count in sorted(ingredients.values(), key=lambda item: (-item[1], item[0]))
+            )
+        return results[:limit]
@@ -68,7 +68,8 @@ const KnowledgeTab: React.FC<KnowledgeTabProps> = ({ config, setConfig }) => {
                     name: r.name,
                     ingredients: Array.isArray(r.ingredients) ? r.ingredients : (JSON.parse(r.ingredients || '[]')),
                     instructions: r.instructions,
-                    imageUrl: r.image_url
+                    // Prefer the locally cached, resized copy over hot-linking the source site
+                    imageUrl: r.image_hash ? `http://localhost:5000/api/images/${r.image_hash}?size=medium` : r.image_url
                 }));
                 // Update local visual state
                 setDbRecipes(mapped);
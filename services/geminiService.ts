@@ -44,7 +44,7 @@ const searchBackendRecipes = async (query: string): Promise<Recipe[]> => {
             name: r.name,
             ingredients: Array.isArray(r.ingredients) ? r.ingredients : (JSON.parse(r.ingredients || '[]')),
             instructions: r.instructions,
-            imageUrl: r.image_url,
+            imageUrl: r.image_hash ? `/api/images/${r.image_hash}?size=thumb` : r.image_url,
             sourceUrl: r.source_url
         }));
     } catch (e) {